@@ -10,7 +10,7 @@ PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from evaluators.utils import save_json
+from evaluators.utils import save_json, load_processed_ids, close_jsonl_writers
 
 
 def _em_equal(pred: str, gold: str) -> bool:
@@ -50,17 +50,7 @@ def main():
     os.makedirs(out_dir, exist_ok=True)
     out_file = os.path.join(out_dir, 'eval_results.json')
 
-    processed_ids = set()
-    if os.path.exists(out_file):
-        try:
-            with open(out_file, 'r', encoding='utf-8') as ef:
-                existing = json.load(ef)
-                for item in existing:
-                    qid = str(item.get('question_id'))
-                    if qid:
-                        processed_ids.add(qid)
-        except Exception:
-            processed_ids = set()
+    processed_ids = load_processed_ids(out_file)
 
     if skip_ids:
         processed_ids.update(skip_ids)
@@ -80,6 +70,7 @@ def main():
         }
         out_row.update({k: q[k] for k in ("label", "difficulty") if k in q})
         save_json(out_row, out_file, append=True)
+    close_jsonl_writers()
 
 
 if __name__ == '__main__':
@@ -1,13 +1,16 @@
-import sqlite3
 import re
 from copy import deepcopy as dc
 import os, sys, json
 import argparse
 from tqdm import tqdm
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 sys.path.insert(0, os.path.join(BASE_DIR, 'ETM.zip'))
 from treeMatch import preprocess, parseTree, compareTrees
 from ETM_utils.process_sql import get_schema
+from evaluators.utils import connect_db
 
 def ETM(question, pred_sql) -> bool:
     ALLRULES = [100,101,102,103,104,105,106,107,108,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26]
@@ -19,7 +22,7 @@ def ETM(question, pred_sql) -> bool:
     gold = preprocess(question["gold_sql"], schema)
     pred = preprocess(pred_sql, schema)
 
-    conn = sqlite3.connect(db)
+    conn = connect_db(db)
     c = conn.cursor()
     bad = False
     try:
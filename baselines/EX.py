@@ -3,7 +3,6 @@ import sys
 import json
 import argparse
 import re
-import sqlite3
 from tqdm import tqdm
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -11,39 +10,32 @@ PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from evaluators.utils import run_with_timeout, save_json
+from evaluators.compare import results_equal, COMPARE_MODES
+from evaluators.sql_tables import has_top_level_order_by
+from evaluators.utils import run_with_timeout, save_json, load_processed_ids, close_jsonl_writers, connect_db, set_exec_mode, format_exec_stats, EXEC_MODES, sql_cacheable, enable_result_cache, enable_gold_cache
 
 
 def _resolve_db_path(db_id: str) -> str:
     return os.path.join(PROJECT_ROOT, 'dev_databases', db_id, f'{db_id}.sqlite')
 
 
+@sql_cacheable("rows", _resolve_db_path)
 def _sqlite_fetchall(db_id: str, sql: str):
     db_path = _resolve_db_path(db_id)
-    with sqlite3.connect(db_path) as conn:
+    with connect_db(db_path) as conn:
         cur = conn.cursor()
         cur.execute(sql)
         rows = cur.fetchall()
     return rows
 
 
-def _rows_equal(pred_rows, gold_rows) -> bool:
-    if pred_rows is None and gold_rows is None:
-        return True
-    if pred_rows is None or gold_rows is None:
-        return False
-    try:
-        return set(pred_rows) == set(gold_rows)
-    except Exception:
-        try:
-            pred_rows = [tuple(r) for r in (pred_rows or [])]
-            gold_rows = [tuple(r) for r in (gold_rows or [])]
-            return set(pred_rows) == set(gold_rows)
-        except Exception:
-            return False
+def _compare_mode(gold_sql: str, mode: str) -> str:
+    if mode != 'auto':
+        return mode
+    return 'ordered' if has_top_level_order_by(gold_sql) else 'multiset'
 
 
-def EX(question: dict, pred_sql: str) -> bool:
+def EX(question: dict, pred_sql: str, mode: str = 'auto') -> bool:
     db_id = question["db_id"]
     gold_sql = question["gold_sql"]
 
@@ -53,7 +45,7 @@ def EX(question: dict, pred_sql: str) -> bool:
     if gold_rows is False or pred_rows is False:
         return False
 
-    return _rows_equal(pred_rows, gold_rows)
+    return results_equal(pred_rows, gold_rows, _compare_mode(gold_sql, mode))
 
 
 def main():
@@ -62,7 +54,17 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--input', dest='input_path', default=None)
     parser.add_argument('--skip-file', type=str, default=None)
+    parser.add_argument('--exec-mode', choices=EXEC_MODES, default='process')
+    parser.add_argument('--result-cache', type=str, default=None)
+    parser.add_argument('--gold-cache', type=str, default=None, help='Gold SQL artifact from precompute.py')
+    parser.add_argument('--compare-mode', choices=('auto',) + COMPARE_MODES, default='auto',
+                        help="auto: ordered when the gold SQL has a top-level ORDER BY, else multiset; 'set' is the original BIRD set(pred) == set(gold)")
     args = parser.parse_args()
+    set_exec_mode(args.exec_mode)
+    if args.result_cache:
+        enable_result_cache(args.result_cache)
+    if args.gold_cache:
+        enable_gold_cache(args.gold_cache)
 
     input_path = args.input_path if args.input_path else os.path.join(base, 'test.json')
     if not os.path.exists(input_path):
@@ -86,17 +88,7 @@ def main():
     os.makedirs(out_dir, exist_ok=True)
     out_file = os.path.join(out_dir, 'eval_results.json')
 
-    processed_ids = set()
-    if os.path.exists(out_file):
-        try:
-            with open(out_file, 'r', encoding='utf-8') as ef:
-                existing = json.load(ef)
-                for item in existing:
-                    qid = str(item.get('question_id'))
-                    if qid:
-                        processed_ids.add(qid)
-        except Exception:
-            processed_ids = set()
+    processed_ids = load_processed_ids(out_file)
 
     if skip_ids:
         processed_ids.update(skip_ids)
@@ -104,7 +96,7 @@ def main():
     to_process = [q for q in questions if str(q.get('question_id')) not in processed_ids]
     for q in tqdm(to_process, total=len(to_process)):
         pred_sql = q.get('predicted_sql') or ''
-        score = 1.0 if EX(q, pred_sql) else 0.0
+        score = 1.0 if EX(q, pred_sql, args.compare_mode) else 0.0
         out_row = {
             "question_id": q.get("question_id"),
             "question": q.get("question"),
@@ -115,6 +107,8 @@ def main():
         }
         out_row.update({k: q[k] for k in ("label", "difficulty") if k in q})
         save_json(out_row, out_file, append=True)
+    close_jsonl_writers()
+    print(format_exec_stats())
 
 
 if __name__ == '__main__':
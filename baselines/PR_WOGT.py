@@ -3,7 +3,6 @@ import sys
 import json
 import argparse
 import re
-from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -11,7 +10,11 @@ PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from evaluators.utils import execute_sql, write_result_to_file, run_with_timeout
+from evaluators.utils import execute_sql, write_result_to_file, run_with_timeout, get_db_info, extract_json_from_response, save_json, set_exec_mode, format_exec_stats, EXEC_MODES, enable_result_cache, load_processed_ids, close_jsonl_writers, schema_catalog
+from evaluators.scheduler import run_queue, cost_model, load_latency_history, save_latency_history, format_utilization
+from evaluators.render import render_result
+from evaluators.llm import chat_completion, configure_llm_client, enable_llm_cache, format_llm_cache_stats
+from evaluators.accounting import enable_call_log, load_calls, format_call_report
 from prompts.prompt_pr_wogt import system_prompt_pr_wogt, user_prompt_pr_wogt
 
 
@@ -25,32 +28,24 @@ class PR_WOGT:
     def call(self, question, pred_sql: str, pred_result):
         """Validate predicted SQL without gold standard"""
         try:
-            from evaluators.utils import get_db_info, extract_json_from_response, save_json
-            import openai
-            from dotenv import load_dotenv
-            load_dotenv()
-            
             db_info = get_db_info(question["db_id"], pred_sql)
-            pred_result = pred_result.head(20) if pred_result is not None else None
-            
             user_content = user_prompt_pr_wogt.format(
                 question=question["question"],
                 evidence=question.get("evidence", ""),
                 predicted_sql=pred_sql,
                 db_info=db_info,
-                sql_result=pred_result
+                sql_result=render_result(pred_result)
             )
             
-            client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL"))
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
+            result = chat_completion(
+                self.model,
+                [
                     {"role": "system", "content": system_prompt_pr_wogt},
                     {"role": "user", "content": user_content}
                 ],
+                stage="pr_wogt", question=question,
+                parse=lambda content: json.loads(extract_json_from_response(content)),
             )
-
-            result = json.loads(extract_json_from_response(response.choices[0].message.content))
             output_data = {
                 "question_id": question["question_id"],
                 "result": result
@@ -93,53 +88,56 @@ def main():
     parser = argparse.ArgumentParser(description="PR_WOGT (Prover-Refuter combined without ground truth) ablation experiment")
     parser.add_argument("--threads", type=int, default=1, help="Number of threads")
     parser.add_argument("--input", type=str, default="sample.json", help="Input file path")
+    parser.add_argument("--exec-mode", choices=EXEC_MODES, default="process", help="SQL timeout enforcement: pooled worker process or in-process progress handler")
+    parser.add_argument("--result-cache", type=str, default=None, help="Directory of the on-disk SQL result cache")
+    parser.add_argument("--llm-cache", type=str, default=None, help="SQLite file caching LLM responses by model and rendered prompt")
     args = parser.parse_args()
+    set_exec_mode(args.exec_mode)
+    if args.result_cache:
+        enable_result_cache(args.result_cache)
     reasoning_model = "google/gemini-2.5-flash"
 
     input_stem = re.sub(r"(-result)$", "", os.path.splitext(os.path.basename(args.input))[0])
     output_dir = f"output/test/gemini-ablation/pr-wogt"
     os.makedirs(output_dir, exist_ok=True)
+    call_log = enable_call_log(output_dir)
 
     pr_wogt = PR_WOGT(model=reasoning_model, output_dir=output_dir)
 
     num_threads = max(1, int(args.threads))
+    configure_llm_client(pool_size=num_threads)
+    if args.llm_cache:
+        enable_llm_cache(args.llm_cache)
     existing_results_path = os.path.join(output_dir, "eval_results.json")
 
     with open(args.input, "r", encoding="utf-8") as f:
         questions = json.load(f)
 
-    existing_ids = set()
-    if os.path.exists(existing_results_path):
-        try:
-            with open(existing_results_path, "r", encoding="utf-8") as ef:
-                existing_data = json.load(ef)
-                for item in existing_data:
-                    qid = str(item.get("question_id"))
-                    if qid:
-                        existing_ids.add(qid)
-        except Exception:
-            existing_ids = set()
+    existing_ids = load_processed_ids(existing_results_path)
 
     total_input = len(questions)
     questions = [q for q in questions if str(q.get("question_id")) not in existing_ids]
     to_process = len(questions)
     print(f"Input total: {total_input}, To process: {to_process}")
+    schema_catalog.build(q["db_id"] for q in questions)
 
     progress = tqdm(total=to_process, dynamic_ncols=True, mininterval=0.5)
 
-    def worker(idx):
-        slice_questions = questions[idx::num_threads]
-        for q in slice_questions:
-            _process_question(q, pr_wogt, output_dir)
-            progress.update(1)
-        return []
-
-    with ThreadPoolExecutor(max_workers=num_threads) as executor:
-        futures = [executor.submit(worker, i) for i in range(num_threads)]
-        for f in futures:
-            f.result()
+    history_path = os.path.join(output_dir, "latency_history.json")
+    latency_history = load_latency_history(history_path)
+    _, report = run_queue(
+        questions, lambda q: _process_question(q, pr_wogt, output_dir), num_threads,
+        cost=cost_model(questions, latency_history), key=lambda q: str(q.get("question_id")),
+        on_done=lambda _: progress.update(1),
+    )
+    save_latency_history(history_path, latency_history, report["durations"])
 
     progress.close()
+    close_jsonl_writers()
+    print(format_exec_stats())
+    print(format_llm_cache_stats())
+    print(format_call_report(load_calls(call_log)))
+    print(format_utilization(report))
 
 
 if __name__ == "__main__":
@@ -2,7 +2,6 @@ import os
 import sys
 import json
 import argparse
-from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -10,8 +9,11 @@ PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from evaluators.utils import execute_sql, write_result_to_file, run_with_timeout
+from evaluators.utils import execute_sql, write_result_to_file, run_with_timeout, set_exec_mode, format_exec_stats, EXEC_MODES, enable_result_cache, load_processed_ids, close_jsonl_writers, schema_catalog
+from evaluators.scheduler import run_queue, cost_model, load_latency_history, save_latency_history, format_utilization
 from evaluators.Prover import Prover
+from evaluators.llm import configure_llm_client, enable_llm_cache, format_llm_cache_stats
+from evaluators.accounting import enable_call_log, load_calls, format_call_report
 
 
 def _process_question(question, prover, output_dir):
@@ -38,7 +40,13 @@ def main():
     parser = argparse.ArgumentParser(description="Prover Only ablation experiment")
     parser.add_argument("--threads", type=int, default=1, help="Number of threads")
     parser.add_argument("--input", type=str, default="sample.json", help="Input file path")
+    parser.add_argument("--exec-mode", choices=EXEC_MODES, default="process", help="SQL timeout enforcement: pooled worker process or in-process progress handler")
+    parser.add_argument("--result-cache", type=str, default=None, help="Directory of the on-disk SQL result cache")
+    parser.add_argument("--llm-cache", type=str, default=None, help="SQLite file caching LLM responses by model and rendered prompt")
     args = parser.parse_args()
+    set_exec_mode(args.exec_mode)
+    if args.result_cache:
+        enable_result_cache(args.result_cache)
     reasoning_model = "deepseek/deepseek-r1-0528"
 
     input_stem = os.path.splitext(os.path.basename(args.input))[0]
@@ -46,47 +54,44 @@ def main():
     method_root_dir = os.path.join("output", "rose-vec", input_stem)
     output_dir = os.path.join(method_root_dir, reasoning_model_safe, "ProverOnly")
     os.makedirs(output_dir, exist_ok=True)
+    call_log = enable_call_log(output_dir)
 
     prover = Prover(model=reasoning_model, output_dir=output_dir)
 
     num_threads = max(1, int(args.threads))
+    configure_llm_client(pool_size=num_threads)
+    if args.llm_cache:
+        enable_llm_cache(args.llm_cache)
     existing_results_path = os.path.join(output_dir, "eval_results.json")
 
     with open(args.input, "r", encoding="utf-8") as f:
         questions = json.load(f)
 
-    existing_ids = set()
-    if os.path.exists(existing_results_path):
-        try:
-            with open(existing_results_path, "r", encoding="utf-8") as ef:
-                existing_data = json.load(ef)
-                for item in existing_data:
-                    qid = str(item.get("question_id"))
-                    if qid:
-                        existing_ids.add(qid)
-        except Exception:
-            existing_ids = set()
+    existing_ids = load_processed_ids(existing_results_path)
 
     total_input = len(questions)
     questions = [q for q in questions if str(q.get("question_id")) not in existing_ids]
     to_process = len(questions)
     print(f"Input total: {total_input}, To process: {to_process}")
+    schema_catalog.build(q["db_id"] for q in questions)
 
     progress = tqdm(total=to_process, dynamic_ncols=True, mininterval=0.5)
 
-    def worker(idx):
-        slice_questions = questions[idx::num_threads]
-        for q in slice_questions:
-            _process_question(q, prover, output_dir)
-            progress.update(1)
-        return []
-
-    with ThreadPoolExecutor(max_workers=num_threads) as executor:
-        futures = [executor.submit(worker, i) for i in range(num_threads)]
-        for f in futures:
-            f.result()
+    history_path = os.path.join(output_dir, "latency_history.json")
+    latency_history = load_latency_history(history_path)
+    _, report = run_queue(
+        questions, lambda q: _process_question(q, prover, output_dir), num_threads,
+        cost=cost_model(questions, latency_history), key=lambda q: str(q.get("question_id")),
+        on_done=lambda _: progress.update(1),
+    )
+    save_latency_history(history_path, latency_history, report["durations"])
 
     progress.close()
+    close_jsonl_writers()
+    print(format_exec_stats())
+    print(format_llm_cache_stats())
+    print(format_call_report(load_calls(call_log)))
+    print(format_utilization(report))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+import os
+import gc
+import sys
+import json
+import argparse
+from pathlib import Path
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from evaluators.utils import execute_sql, run_with_timeout, set_exec_mode, EXEC_MODES, get_worker_pool
+from evaluators.scheduler import run_queue
+from evaluators.gold_cache import gold_sql_of
+
+
+def drop_page_cache(paths) -> bool:
+    """Ask the kernel to evict the files' cached pages (Linux posix_fadvise DONTNEED)"""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def build_workload(questions, db_root: Path, databases):
+    items = []
+    for q in questions:
+        if q["db_id"] not in databases:
+            continue
+        db_path = db_root / q["db_id"] / f"{q['db_id']}.sqlite"
+        for sql in (gold_sql_of(q), q.get("predicted_sql")):
+            if sql:
+                items.append({"db_id": q["db_id"], "db_path": db_path, "sql": sql})
+    return items
+
+
+def run_config(items, threads, timeout, affinity, cold, db_files):
+    # Pooled connections live on the previous run's threads; collect them so their mmaps go away before evicting
+    gc.collect()
+    if cold and not drop_page_cache(db_files):
+        print("posix_fadvise is not available; 'cold' runs are not actually cold")
+    _, report = run_queue(
+        items, lambda it: run_with_timeout(execute_sql, it["db_path"], it["sql"], timeout=timeout), threads,
+        group=(lambda it: it["db_id"]) if affinity else None,
+    )
+    wall = report["wall_seconds"]
+    return {
+        "order": "db-affinity" if affinity else "file",
+        "cache": "cold" if cold else "hot",
+        "queries": len(items),
+        "wall_seconds": wall,
+        "queries_per_second": round(len(items) / wall, 2) if wall > 0 else None,
+        "group_switches": report.get("group_switches"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold vs hot page-cache throughput of file-order and db-affinity scheduling")
+    parser.add_argument("--input", type=str, default=os.path.join(PROJECT_ROOT, "data", "dev.json"))
+    parser.add_argument("--db-root", type=str, default=os.path.join(PROJECT_ROOT, "dev_databases"))
+    parser.add_argument("--databases", nargs="*", default=None, help="db_ids to include (default: the --largest biggest databases)")
+    parser.add_argument("--largest", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--exec-mode", choices=EXEC_MODES, default="inprocess")
+    parser.add_argument("--output", type=str, default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+    set_exec_mode(args.exec_mode)
+
+    db_root = Path(args.db_root)
+    with open(args.input, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    databases = args.databases
+    if not databases:
+        sizes = {db_id: (db_root / db_id / f"{db_id}.sqlite").stat().st_size
+                 for db_id in {q["db_id"] for q in questions} if (db_root / db_id / f"{db_id}.sqlite").exists()}
+        databases = sorted(sizes, key=sizes.get, reverse=True)[:args.largest]
+    db_files = [db_root / db_id / f"{db_id}.sqlite" for db_id in databases]
+    items = build_workload(questions, db_root, set(databases))
+    total_mb = sum(p.stat().st_size for p in db_files) / (1 << 20)
+    print(f"Databases: {', '.join(databases)} ({total_mb:.0f} MB), queries: {len(items)}, threads: {args.threads}, exec mode: {args.exec_mode}")
+
+    results = []
+    for affinity in (False, True):
+        for cold in (True, False):
+            if cold and args.exec_mode == "process":
+                get_worker_pool().drain()
+            res = run_config(items, args.threads, args.timeout, affinity, cold, db_files)
+            results.append(res)
+            print(f"{res['order']:>11} / {res['cache']}: wall={res['wall_seconds']:.2f}s, "
+                  f"{res['queries_per_second']} queries/s, group switches={res['group_switches']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,12 @@ from typing import Tuple, Optional, Dict, Any, List
 from pathlib import Path
 import sqlparse
 
+PROJECT_ROOT = str(Path(__file__).resolve().parents[2])
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from evaluators.connection_pool import ConnectionPool
+
 st.set_page_config(page_title="NL2SQL Annotator", layout="wide")
 
 # --------------------------- Utilities ---------------------------
@@ -51,14 +57,23 @@ def add_limit(sql: str, max_rows: int = 200) -> str:
         return body
     return body + f" LIMIT {max_rows}"
 
-def connect_ro(db_path: str, timeout_seconds: float = 1.5, max_ops: int = 1_000_000):
+RO_TIMEOUT_SECONDS = 1.5
+
+def connect_ro(db_path: str, cached_statements: int = 256):
     uri = f"file:{db_path}?mode=ro"
-    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=timeout_seconds)
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=RO_TIMEOUT_SECONDS, cached_statements=cached_statements)
     try:
         conn.execute("PRAGMA query_only=ON;")
         conn.execute("PRAGMA foreign_keys=ON;")
     except Exception:
         pass
+    return conn
+
+# Per thread, so sessions never share a connection or its progress handler; a failed health check replaces only that entry
+_ro_pool = ConnectionPool(connect_ro, max_per_thread=16)
+
+def pooled_ro(db_path: str, max_ops: int = 1_000_000):
+    conn = _ro_pool.get(db_path)
     op_counter = {"count": 0}
     def progress_handler():
         op_counter["count"] += 1
@@ -74,7 +89,7 @@ def run_sql(db_path: str, sql: str, limit_rows: int = 200) -> Tuple[Optional[pd.
     q = add_limit(sql, limit_rows)
     t0 = time.time()
     try:
-        with connect_ro(db_path) as conn:
+        with pooled_ro(db_path) as conn:
             df = pd.read_sql_query(q, conn)
         dt = time.time() - t0
         return df, None, dt
@@ -84,7 +99,7 @@ def run_sql(db_path: str, sql: str, limit_rows: int = 200) -> Tuple[Optional[pd.
 
 def get_schema_ddl(db_path: str) -> str:
     try:
-        with connect_ro(db_path) as conn:
+        with pooled_ro(db_path) as conn:
             cur = conn.cursor()
             cur.execute("SELECT type, name, sql FROM sqlite_master WHERE type IN ('table','view','index','trigger') AND name NOT LIKE 'sqlite_%' ORDER BY type, name;")
             rows = cur.fetchall()
@@ -1,13 +1,11 @@
 import os
 import json
-import openai
-from dotenv import load_dotenv
-from typing import Dict, Any
+from typing import Dict, Any, List
 from .utils import get_db_info, extract_json_from_response, save_json
+from .llm import chat_completion, achat_completion
+from .render import render_result
 from prompts.prompt_refuter import system_prompt_refuter, user_prompt_refuter, user_prompt_refuter_without_results
 
-load_dotenv()
-
 
 class Refuter:
     """Refuter validates predicted SQL against gold standard SQL to identify critical conflicts"""
@@ -16,57 +14,76 @@ class Refuter:
         self.model = model
         self.output_dir = output_dir
     
-    def call(self, question: Dict[str, Any], pred_sql: str, pred_result: Any = None, gold_result: Any = None, prover_reason: str = None) -> bool:
-        """Validate predicted SQL against gold standard SQL for critical conflicts"""
-        try:
-            db_info = get_db_info(question["db_id"], [pred_sql, question["gold_sql"]])
-            
-            if pred_result is not None and gold_result is not None:
-
-                pred_result = pred_result.head(20)
-                gold_result = gold_result.head(20)
-                
-                user_content = user_prompt_refuter.format(
-                    question=question["question"],
-                    evidence=question.get("evidence", ""),
-                    predicted_sql=pred_sql,
-                    gold_sql=question["gold_sql"],
-                    db_info=db_info,
-                    pred_result=pred_result,
-                    gold_result=gold_result,
-                    prover_reason=prover_reason
-                )
-            else:
-                user_content = user_prompt_refuter_without_results.format(
-                    question=question["question"],
-                    evidence=question.get("evidence", ""),
-                    predicted_sql=pred_sql,
-                    gold_sql=question["gold_sql"],
-                    db_info=db_info,
-                )
-            
-            client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL"))
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt_refuter},
-                    {"role": "user", "content": user_content}
-                ],
-                # temperature=0
+    def build_messages(self, question: Dict[str, Any], pred_sql: str, pred_result: Any = None, gold_result: Any = None, prover_reason: str = None) -> List[Dict[str, str]]:
+        db_info = get_db_info(question["db_id"], [pred_sql, question["gold_sql"]])
+        
+        if pred_result is not None and gold_result is not None:
+            user_content = user_prompt_refuter.format(
+                question=question["question"],
+                evidence=question.get("evidence", ""),
+                predicted_sql=pred_sql,
+                gold_sql=question["gold_sql"],
+                db_info=db_info,
+                pred_result=render_result(pred_result),
+                gold_result=render_result(gold_result),
+                prover_reason=prover_reason
             )
-            
-            result = json.loads(extract_json_from_response(response.choices[0].message.content))
-            # print(response.choices[0].message.content)
-            # Save output to a single JSON file (append mode)
-            output_data = {
-                "question_id": question["question_id"],
-                "result": result
-            }
-            output_file = os.path.join(self.output_dir, "refuter_output.json")
-            save_json(output_data, output_file, append=True)
+        else:
+            user_content = user_prompt_refuter_without_results.format(
+                question=question["question"],
+                evidence=question.get("evidence", ""),
+                predicted_sql=pred_sql,
+                gold_sql=question["gold_sql"],
+                db_info=db_info,
+            )
+        return [
+            {"role": "system", "content": system_prompt_refuter},
+            {"role": "user", "content": user_content}
+        ]
+    
+    def parse_response(self, question: Dict[str, Any], content: str) -> bool:
+        result = json.loads(extract_json_from_response(content))
+        # Save output to a single JSON file (append mode)
+        output_data = {
+            "question_id": question["question_id"],
+            "result": result
+        }
+        output_file = os.path.join(self.output_dir, "refuter_output.json")
+        save_json(output_data, output_file, append=True)
+
+        return result.get("verdict", None)
+    
+    @staticmethod
+    def _check_response(content: str) -> str:
+        """Content unchanged if it holds a JSON verdict; raises otherwise, so the reply is not cached"""
+        json.loads(extract_json_from_response(content))
+        return content
 
-            return result.get("verdict", None)
+    def request(self, question: Dict[str, Any], pred_sql: str, pred_result: Any = None, gold_result: Any = None, prover_reason: str = None) -> str:
+        """Raw model response, neither parsed nor logged, for callers that may discard it"""
+        return chat_completion(self.model, self.build_messages(question, pred_sql, pred_result, gold_result, prover_reason), stage="refuter_speculative", question=question,
+                               parse=self._check_response)
 
+    async def arequest(self, question: Dict[str, Any], pred_sql: str, pred_result: Any = None, gold_result: Any = None, prover_reason: str = None) -> str:
+        return await achat_completion(self.model, self.build_messages(question, pred_sql, pred_result, gold_result, prover_reason), stage="refuter_speculative", question=question,
+                                      parse=self._check_response)
+
+    def call(self, question: Dict[str, Any], pred_sql: str, pred_result: Any = None, gold_result: Any = None, prover_reason: str = None) -> bool:
+        """Validate predicted SQL against gold standard SQL for critical conflicts"""
+        try:
+            messages = self.build_messages(question, pred_sql, pred_result, gold_result, prover_reason)
+            return chat_completion(self.model, messages, stage="refuter", question=question,
+                                   parse=lambda content: self.parse_response(question, content))
+        except Exception as e:
+            print(f"Refuter error: {e}")
+            return None
+    
+    async def acall(self, question: Dict[str, Any], pred_sql: str, pred_result: Any = None, gold_result: Any = None, prover_reason: str = None) -> bool:
+        """Async variant of call using the shared async client"""
+        try:
+            messages = self.build_messages(question, pred_sql, pred_result, gold_result, prover_reason)
+            return await achat_completion(self.model, messages, stage="refuter", question=question,
+                                          parse=lambda content: self.parse_response(question, content))
         except Exception as e:
             print(f"Refuter error: {e}")
             return None
@@ -0,0 +1,120 @@
+"""Per-call LLM accounting: one llm_calls.jsonl record per chat completion, plus aggregate reports.
+
+    python -m evaluators.accounting output/rose-vec/dev/<model>/ROSE/llm_calls.json --by stage db_id difficulty
+"""
+import json
+import time
+import argparse
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from .jsonl import get_jsonl_writer, jsonl_path_for, read_jsonl
+
+CALL_LOG_FILE = "llm_calls.json"
+REPORT_KEYS = ("stage", "db_id", "difficulty")
+TOKEN_FIELDS = ("prompt_tokens", "completion_tokens", "reasoning_tokens", "cached_tokens")
+_call_log: Dict[str, Path | None] = {"path": None}
+
+
+def enable_call_log(output_dir: str | Path) -> Path:
+    """Record every chat completion to output_dir/llm_calls.jsonl (compacted to llm_calls.json at exit)"""
+    _call_log["path"] = Path(output_dir) / CALL_LOG_FILE
+    return _call_log["path"]
+
+
+def cached_tokens(usage: Dict[str, Any]) -> int:
+    """Prompt tokens served from the provider's prefix cache (OpenAI-style details or DeepSeek's hit count)"""
+    details = usage.get("prompt_tokens_details") or {}
+    return int(details.get("cached_tokens") or usage.get("prompt_cache_hit_tokens") or 0)
+
+
+def usage_counts(usage: Dict[str, Any] | None) -> Dict[str, int]:
+    usage = usage or {}
+    details = usage.get("completion_tokens_details") or {}
+    return {
+        "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+        "completion_tokens": int(usage.get("completion_tokens") or 0),
+        "reasoning_tokens": int(details.get("reasoning_tokens") or 0),
+        "cached_tokens": cached_tokens(usage),
+    }
+
+
+def log_call(model: str, stage: str | None, question: Dict[str, Any] | None, latency: float,
+             usage: Dict[str, Any] | None = None, retries: int = 0, throttled: float = 0.0,
+             cache_hit: bool = False, error: str | None = None):
+    """Append one call record; a no-op until enable_call_log is called. Cache hits count no tokens."""
+    if _call_log["path"] is None:
+        return
+    question = question or {}
+    record = {
+        "question_id": question.get("question_id"),
+        "db_id": question.get("db_id"),
+        "difficulty": question.get("difficulty"),
+        "stage": stage,
+        "model": model,
+        **usage_counts(None if cache_hit else usage),
+        "latency": round(latency, 3),
+        "throttled": round(throttled, 3),
+        "retries": retries,
+        "cache_hit": cache_hit,
+        "error": error,
+        "time": round(time.time(), 3),
+    }
+    get_jsonl_writer(_call_log["path"]).append(record)
+
+
+def load_calls(path: str | Path) -> List[Dict[str, Any]]:
+    """Call records from the JSONL log if present, else from the compacted JSON array"""
+    path = Path(path)
+    jsonl_path = path if path.suffix == ".jsonl" else jsonl_path_for(path)
+    if jsonl_path.exists():
+        return read_jsonl(jsonl_path)
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def summarize_calls(records: Iterable[Dict[str, Any]], key: str) -> Dict[str, Dict[str, Any]]:
+    """Calls, cache hits, errors, retries, token sums and latency (total, mean, p95) per value of key"""
+    groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for r in records:
+        groups[str(r.get(key))].append(r)
+    summary = {}
+    for name, rows in groups.items():
+        latencies = sorted(r["latency"] for r in rows if not r.get("cache_hit"))
+        row = {
+            "calls": len(rows),
+            "cache_hits": sum(1 for r in rows if r.get("cache_hit")),
+            "errors": sum(1 for r in rows if r.get("error")),
+            "retries": sum(r.get("retries", 0) for r in rows),
+            **{field: sum(r.get(field, 0) for r in rows) for field in TOKEN_FIELDS},
+            "latency_total": round(sum(latencies), 3),
+            "latency_mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "latency_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+        }
+        summary[name] = row
+    return dict(sorted(summary.items(), key=lambda kv: kv[1]["latency_total"], reverse=True))
+
+
+def format_call_report(records: List[Dict[str, Any]], keys: Iterable[str] = ("stage",)) -> str:
+    lines = []
+    for key in keys:
+        lines.append(f"LLM calls by {key}:")
+        for name, s in summarize_calls(records, key).items():
+            lines.append(
+                f"  {name}: calls={s['calls']}, cache_hits={s['cache_hits']}, errors={s['errors']}, retries={s['retries']}, "
+                f"prompt={s['prompt_tokens']} (cached {s['cached_tokens']}), completion={s['completion_tokens']} "
+                f"(reasoning {s['reasoning_tokens']}), latency total={s['latency_total']:.1f}s "
+                f"mean={s['latency_mean']:.2f}s p95={s['latency_p95']:.2f}s"
+            )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate an llm_calls.json log")
+    parser.add_argument("path", type=str, help="llm_calls.json (or its .jsonl log)")
+    parser.add_argument("--by", nargs="+", default=list(REPORT_KEYS), help="Fields to group by")
+    args = parser.parse_args()
+    print(format_call_report(load_calls(args.path), args.by))
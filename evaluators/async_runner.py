@@ -0,0 +1,35 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable, List
+
+
+async def run_queue_async(items: Iterable[Any], process: Callable[[Any], Awaitable[Any]], concurrency: int,
+                          on_done: Callable[[Any], None] = None, key: Callable[[Any], str] = None) -> List[Any]:
+    """Drain items through `concurrency` consumer tasks pulling from one work queue.
+
+    A slow item only occupies its own consumer; the others keep pulling, so up to
+    `concurrency` items (and their LLM requests) are in flight at any time.
+    Results are returned in completion order; an item whose processing raised
+    yields key(item), so the caller records it as a problem instead of losing it.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+    results: List[Any] = []
+
+    async def consumer():
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                res = await process(item)
+            except Exception as e:
+                print(f"Async worker error: {e}")
+                res = key(item) if key is not None else None
+            results.append(res)
+            if on_done is not None:
+                on_done(res)
+
+    await asyncio.gather(*(consumer() for _ in range(max(1, min(concurrency, queue.qsize())))))
+    return results
@@ -0,0 +1,193 @@
+"""Batch submission for offline runs: an OpenAI-compatible Batch API backend and a local emulation.
+
+Requests are JSONL lines in the Batch API input format; results come back as output lines keyed
+by custom_id. BatchState records each phase's input file, batch id and output file in
+batch_state.json, so an interrupted run resumes polling instead of resubmitting.
+"""
+import os
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from .governor import governor, estimate_tokens
+from .llm import get_client
+from .jsonl import read_jsonl
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_BACKENDS = ("openai", "local")
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def request_line(custom_id: str, model: str, messages: List[Dict[str, Any]], **body) -> Dict[str, Any]:
+    return {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT,
+            "body": {"model": model, "messages": messages, **body}}
+
+
+def _write_jsonl(path: str | Path, records: List[Dict[str, Any]]):
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+def read_results(path: str | Path) -> Dict[str, Dict[str, Any]]:
+    """custom_id -> {"content", "usage", "error"} from a batch output file (failed requests have content None)"""
+    results = {}
+    for line in read_jsonl(path):
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        error = line.get("error") or (None if response.get("status_code", 200) == 200 else body.get("error") or response.get("status_code"))
+        content = None
+        if error is None:
+            try:
+                content = body["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError) as e:
+                error = f"malformed response: {e}"
+        results[line["custom_id"]] = {"content": content, "usage": body.get("usage"),
+                                      "error": None if error is None else str(error)}
+    return results
+
+
+class OpenAIBatchBackend:
+    """Uploads the input file and runs it through the provider's /v1/batches endpoint"""
+
+    def __init__(self, completion_window: str = "24h"):
+        self.completion_window = completion_window
+
+    def submit(self, input_path: str) -> str:
+        client = get_client()
+        with open(input_path, "rb") as f:
+            uploaded = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT, completion_window=self.completion_window)
+        return batch.id
+
+    def wait(self, batch_id: str, output_path: str, poll_interval: float) -> str:
+        """Poll until the batch ends, then save its output and error lines to output_path; returns the final status"""
+        client = get_client()
+        while True:
+            batch = client.batches.retrieve(batch_id)
+            if batch.status in TERMINAL_STATUSES:
+                break
+            counts = batch.request_counts
+            done = f" ({counts.completed + counts.failed}/{counts.total})" if counts else ""
+            print(f"Batch {batch_id}: {batch.status}{done}")
+            time.sleep(poll_interval)
+        if batch.status == "failed":
+            raise RuntimeError(f"Batch {batch_id} failed: {batch.errors}")
+        tmp = Path(f"{output_path}.tmp")
+        with open(tmp, "wb") as f:
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    data = client.files.content(file_id).content
+                    f.write(data if data.endswith(b"\n") or not data else data + b"\n")
+        os.replace(tmp, output_path)
+        return batch.status
+
+
+class LocalBatchBackend:
+    """Emulates a batch endpoint by sending the requests itself through the shared client and governor.
+
+    Output lines are appended as requests finish, so a resumed run only sends the missing ones.
+    """
+
+    def __init__(self, workers: int = 16):
+        self.workers = max(1, workers)
+
+    def submit(self, input_path: str) -> str:
+        return str(input_path)
+
+    def _send(self, line: Dict[str, Any]) -> Dict[str, Any]:
+        body = line["body"]
+        record = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": line["custom_id"], "response": None, "error": None}
+        try:
+            response = governor.run(body["model"], estimate_tokens(body["messages"]),
+                                    lambda: get_client().chat.completions.create(**body))
+            record["response"] = {"status_code": 200, "body": response.model_dump()}
+        except Exception as e:
+            record["error"] = {"message": str(e)}
+        return record
+
+    def wait(self, batch_id: str, output_path: str, poll_interval: float) -> str:
+        partial = Path(f"{output_path}.partial")
+        done = {r["custom_id"] for r in read_jsonl(partial)} if partial.exists() else set()
+        todo = [line for line in read_jsonl(batch_id) if line["custom_id"] not in done]
+        with open(partial, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for future in as_completed([pool.submit(self._send, line) for line in todo]):
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+        os.replace(partial, output_path)
+        return "completed"
+
+
+def get_batch_backend(name: str, workers: int = 16):
+    if name == "openai":
+        return OpenAIBatchBackend()
+    if name == "local":
+        return LocalBatchBackend(workers)
+    raise ValueError(f"Unknown batch backend: {name}")
+
+
+class BatchState:
+    """Resumable progress of a multi-phase batch run, persisted as JSON after every step"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.data: Dict[str, Any] = {"phases": {}, "extras": {}, "accepted": {}, "problems": []}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.data.update(json.load(f))
+
+    def phase(self, name: str) -> Dict[str, Any]:
+        return self.data["phases"].setdefault(name, {})
+
+    def save(self):
+        tmp = Path(f"{self.path}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
+
+
+def submitted_ids(state: BatchState, name: str) -> List[str]:
+    """custom_ids of the requests a phase submitted, read back from its input file"""
+    input_file = state.phase(name).get("input_file")
+    return [line["custom_id"] for line in read_jsonl(input_file)] if input_file else []
+
+
+def run_phase(backend, state: BatchState, name: str, build: Callable[[], List[Dict[str, Any]]],
+              work_dir: str | Path, poll_interval: float = 60.0) -> Dict[str, Dict[str, Any]]:
+    """Build, submit and wait for one phase, resuming from whichever step batch_state.json reached.
+
+    build is only called when the phase has no input file yet; an empty phase submits nothing.
+    """
+    phase = state.phase(name)
+    if "input_file" not in phase:
+        lines = build()
+        if not lines:
+            phase.update(input_file=None, output_file=None)
+            state.save()
+            return {}
+        phase["input_file"] = str(Path(work_dir) / f"batch_{name}_input.jsonl")
+        phase["requests"] = len(lines)
+        _write_jsonl(phase["input_file"], lines)
+        state.save()
+    if phase["input_file"] is None:
+        return {}
+    if "batch_id" not in phase:
+        phase["batch_id"] = backend.submit(phase["input_file"])
+        state.save()
+        print(f"Batch phase '{name}': submitted {phase['requests']} requests as {phase['batch_id']}")
+    if "output_file" not in phase:
+        output_file = str(Path(work_dir) / f"batch_{name}_output.jsonl")
+        phase["status"] = backend.wait(phase["batch_id"], output_file, poll_interval)
+        phase["output_file"] = output_file
+        state.save()
+    return read_results(phase["output_file"])
@@ -0,0 +1,323 @@
+import math
+import itertools
+
+import numpy as np
+import pandas as pd
+from pandas.util import hash_array
+from typing import Any, Dict, List, Tuple
+
+CHUNK_ROWS = 1_000_000
+FETCH_ROWS = 10_000
+PREVIEW_ROWS = 20
+NULL_HASH = np.uint64(0x9E3779B97F4A7C15)
+ROW_PRIME = np.uint64(0x100000001B3)
+COMPARE_MODES = ("set", "multiset", "ordered")
+MAX_PAIRINGS = 720
+
+NULL, INTEGER, REAL, TEXT, BLOB = 0, 1, 2, 3, 4
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+REAL_TAG = np.uint64(0xC2B2AE3D27D4EB4F)
+BLOB_TAG = np.uint64(0x165667B19E3779F9)
+
+
+def _number(value: float) -> Tuple[int, int, float]:
+    """(kind, int, real) of a float; integral values are exact integers, so 1.0 == 1 as in Python"""
+    if math.isnan(value):
+        return NULL, 0, 0.0
+    if value.is_integer() and INT64_MIN <= value < INT64_MAX:
+        return INTEGER, int(value), 0.0
+    return REAL, 0, value
+
+
+def _cell(value: Any) -> Tuple[int, int, float]:
+    """(kind, int, real) of one object cell: numbers by exact value, text and bytes as themselves, never coerced"""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return NULL, 0, 0.0
+    if isinstance(value, (bool, np.bool_, int, np.integer)):
+        return (INTEGER, int(value), 0.0) if INT64_MIN <= value <= INT64_MAX else (TEXT, 0, 0.0)
+    if isinstance(value, (float, np.floating)):
+        return _number(float(value))
+    if isinstance(value, bytes):
+        return BLOB, 0, 0.0
+    return TEXT, 0, 0.0
+
+
+_cells = np.frompyfunc(_cell, 1, 3)
+
+
+def _floats(num: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(kind, ints, reals) of a float64 array, integral values as exact integers"""
+    integral = np.isfinite(num) & (num == np.floor(num)) & (np.abs(num) < 2.0 ** 63)
+    kind = np.full(len(num), REAL, dtype=np.int8)
+    kind[integral] = INTEGER
+    kind[np.isnan(num)] = NULL
+    return kind, np.where(integral, num, 0).astype(np.int64), np.where(kind == REAL, num, 0.0)
+
+
+def _canonical(col: pd.Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray | None]:
+    """(kind, ints, reals, values) of one column under Python equality, as in BIRD's set(pred) == set(gold):
+    integers as exact int64 (integral floats included), other floats unrounded, NULL/NaN as one kind,
+    text and bytes as their own kinds, so '1' != 1 and '01' != '1'"""
+    n = len(col)
+    if pd.api.types.is_bool_dtype(col.dtype) or pd.api.types.is_integer_dtype(col.dtype):
+        null = col.isna().to_numpy()
+        ints = col.fillna(0).to_numpy(dtype=np.int64) if null.any() else col.to_numpy(dtype=np.int64)
+        kind = np.where(null, NULL, INTEGER).astype(np.int8)
+        return kind, np.where(null, 0, ints), np.zeros(n), None
+    if pd.api.types.is_float_dtype(col.dtype):
+        return (*_floats(col.to_numpy(dtype=np.float64, na_value=np.nan)), None)
+    values = col.to_numpy(dtype=object)
+    if n == 0:
+        return np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int64), np.zeros(0), values
+    # Columns of one Python type skip the per-cell classification
+    inferred = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred in ("string", "bytes"):
+        kind = np.where(pd.isna(values), NULL, TEXT if inferred == "string" else BLOB).astype(np.int8)
+        return kind, np.zeros(n, dtype=np.int64), np.zeros(n), values
+    if inferred == "floating":
+        return (*_floats(np.where(pd.isna(values), np.nan, values).astype(np.float64)), values)
+    kind, ints, reals = _cells(values)
+    return kind.astype(np.int8), ints.astype(np.int64), reals.astype(np.float64), values
+
+
+def column_hashes(col: pd.Series) -> Tuple[np.ndarray, Tuple[int, int, int]]:
+    """Per-cell uint64 hashes of one column plus its (nulls, numbers, texts) profile"""
+    kind, ints, reals, values = _canonical(col)
+    out = np.full(len(kind), NULL_HASH, dtype=np.uint64)
+    integer, real, text, blob = kind == INTEGER, kind == REAL, kind == TEXT, kind == BLOB
+    if integer.any():
+        out[integer] = hash_array(ints[integer])
+    if real.any():
+        out[real] = hash_array(reals[real]) ^ REAL_TAG
+    if text.any():
+        out[text] = hash_array(values[text].astype(str).astype(object))
+    if blob.any():
+        out[blob] = hash_array(values[blob].astype(str).astype(object)) ^ BLOB_TAG
+    return out, (int((kind == NULL).sum()), int((integer | real).sum()), int((text | blob).sum()))
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, so a second additive sum is independent of the first"""
+    z = h + NULL_HASH
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _xor_rows(hashes: List[np.ndarray]) -> int:
+    if not hashes:
+        return 0
+    row_hash = hashes[0].copy()
+    for h in hashes[1:]:
+        np.bitwise_xor(row_hash, h, out=row_hash)
+    return int(np.bitwise_xor.reduce(row_hash)) if len(row_hash) else 0
+
+
+def hash_dataframe(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> int:
+    """Order-insensitive result hash: XOR of cells within a row, XOR of rows; computed chunk by chunk"""
+    acc = 0
+    for start in range(0, len(df), chunk_rows):
+        part = df.iloc[start:start + chunk_rows]
+        acc ^= _xor_rows([column_hashes(part.iloc[:, i])[0] for i in range(part.shape[1])])
+    return acc
+
+
+def _combine_columns(n: int, hashes: List[np.ndarray], ordered_columns: bool) -> np.ndarray:
+    """Row hashes; unordered rows sum mixed cell hashes, so equal cells in one row do not cancel"""
+    row = np.zeros(n, dtype=np.uint64)
+    for h in hashes:
+        row = (row * ROW_PRIME) ^ h if ordered_columns else row + _mix(h)
+    return row
+
+
+class Fingerprint:
+    """Count-aware multiset fingerprint: row count, column type profiles and additive sums of hashes.
+
+    Sums (mod 2**64) count duplicates, unlike XOR where pairs of equal rows cancel;
+    comparing the per-column sums as a sorted list ignores the column order.
+    """
+
+    def __init__(self, columns: int):
+        self.rows = 0
+        self.profiles = [(0, 0, 0)] * columns
+        self.column_sums = [0] * columns
+        self.row_sum = 0
+        self.mix_sum = 0
+
+    def add(self, hashes: List[np.ndarray], profiles: List[Tuple[int, int, int]], n: int) -> "Fingerprint":
+        rows = _combine_columns(n, hashes, ordered_columns=False)
+        self.rows += n
+        self.profiles = [tuple(a + b for a, b in zip(acc, p)) for acc, p in zip(self.profiles, profiles)]
+        self.column_sums = [(acc + int(_mix(h).sum(dtype=np.uint64))) & 0xFFFFFFFFFFFFFFFF for acc, h in zip(self.column_sums, hashes)]
+        self.row_sum = (self.row_sum + int(rows.sum(dtype=np.uint64))) & 0xFFFFFFFFFFFFFFFF
+        self.mix_sum = (self.mix_sum + int(_mix(rows).sum(dtype=np.uint64))) & 0xFFFFFFFFFFFFFFFF
+        return self
+
+    @classmethod
+    def of(cls, df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> "Fingerprint":
+        fp = cls(df.shape[1])
+        for start in range(0, len(df), chunk_rows):
+            part = df.iloc[start:start + chunk_rows]
+            cols = [column_hashes(part.iloc[:, i]) for i in range(part.shape[1])]
+            fp.add([h for h, _ in cols], [p for _, p in cols], len(part))
+        return fp
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Fingerprint):
+            return NotImplemented
+        return (self.rows == other.rows and self.row_sum == other.row_sum and self.mix_sum == other.mix_sum
+                and sorted(zip(self.profiles, self.column_sums)) == sorted(zip(other.profiles, other.column_sums)))
+
+
+def _as_frame(rows: Any) -> pd.DataFrame:
+    """Row tuples as object columns, so cells keep their Python types instead of pandas' coercion"""
+    if isinstance(rows, pd.DataFrame):
+        return rows
+    rows = rows if isinstance(rows, list) else list(rows)
+    return pd.DataFrame({i: pd.Series(col, dtype=object) for i, col in enumerate(zip(*rows))}, index=range(len(rows)))
+
+
+def _dense_ids(keys: List[np.ndarray]) -> np.ndarray:
+    """Dense int64 id per position of equal-length key arrays: equal key tuples get equal ids"""
+    n = len(keys[0]) if keys else 0
+    if n == 0 or not keys:
+        return np.zeros(n, dtype=np.int64)
+    order = np.lexsort(keys[::-1])
+    change = np.zeros(n, dtype=bool)
+    for k in keys:
+        sk = k[order]
+        change[1:] |= sk[1:] != sk[:-1]
+    ids = np.empty(n, dtype=np.int64)
+    ids[order] = np.cumsum(change)
+    return ids
+
+
+def _cell_codes(df1: pd.DataFrame, df2: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Dense int64 code per cell over both frames: equal canonical cells get equal codes"""
+    canon = [_canonical(df.iloc[:, i]) for df in (df1, df2) for i in range(df.shape[1])]
+    # Text and bytes are factorized over both sides at once, so equal values get equal integer codes
+    objects = np.concatenate([np.where(k >= TEXT, v, None) if v is not None else np.full(len(k), None, dtype=object)
+                              for k, _, _, v in canon])
+    codes = _dense_ids([np.concatenate([c[0] for c in canon]), np.concatenate([c[1] for c in canon]),
+                        np.concatenate([c[2] for c in canon]), pd.factorize(objects)[0]])
+    split = df1.shape[0] * df1.shape[1]
+    return (codes[:split].reshape(df1.shape[1], df1.shape[0]).T,
+            codes[split:].reshape(df2.shape[1], df2.shape[0]).T)
+
+
+def _rows_equal(codes1: np.ndarray, codes2: np.ndarray, mode: str) -> bool:
+    """Compare two cell-code matrices row-wise: rows become ids, which are then sorted and compared"""
+    ids = _dense_ids(list(np.vstack([codes1, codes2]).T))
+    ids1, ids2 = ids[:len(codes1)], ids[len(codes1):]
+    if mode == "set":
+        return np.array_equal(np.unique(ids1), np.unique(ids2))
+    if mode == "multiset":
+        return np.array_equal(np.sort(ids1), np.sort(ids2))
+    return np.array_equal(ids1, ids2)
+
+
+def _column_groups(codes1: np.ndarray, codes2: np.ndarray, mode: str) -> List[Tuple[List[int], List[int]]] | None:
+    """Columns of each side grouped by their values (distinct values in set mode); None if the groups differ"""
+    groups: Dict[bytes, Tuple[List[int], List[int]]] = {}
+    for side, codes in enumerate((codes1, codes2)):
+        for i in range(codes.shape[1]):
+            values = np.unique(codes[:, i]) if mode == "set" else np.sort(codes[:, i])
+            groups.setdefault(values.tobytes(), ([], []))[side].append(i)
+    if any(len(cols1) != len(cols2) for cols1, cols2 in groups.values()):
+        return None
+    return list(groups.values())
+
+
+def results_equal(a: Any, b: Any, mode: str = "multiset", ordered_columns: bool = True) -> bool:
+    """Compare two results (DataFrames or sequences of row tuples) over columnar cell codes.
+
+    Cells use one equality policy, Python's, as in the original BIRD set(pred) == set(gold):
+    1 == 1.0, but 1 != '1', '01' != '1' and floats are not rounded. set ignores duplicates
+    and order, multiset ignores order but counts duplicates, ordered requires the same rows
+    in the same order. With ordered_columns=False the columns may also be permuted: each
+    pairing of columns holding the same values is tried, and beyond MAX_PAIRINGS such tied
+    cells are compared sorted within each row.
+    """
+    if mode not in COMPARE_MODES:
+        raise ValueError(f"Unknown compare mode: {mode}")
+    if a is None or b is None:
+        return a is None and b is None
+    a, b = _as_frame(a), _as_frame(b)
+    if len(a) == 0 or len(b) == 0:
+        return len(a) == len(b)
+    if a.shape[1] != b.shape[1]:
+        return False
+    codes1, codes2 = _cell_codes(a, b)
+    if ordered_columns:
+        return _rows_equal(codes1, codes2, mode)
+    groups = _column_groups(codes1, codes2, mode)
+    if groups is None:
+        return False
+    if math.prod(math.factorial(len(cols1)) for cols1, _ in groups) <= MAX_PAIRINGS:
+        left = codes1[:, [i for cols1, _ in groups for i in cols1]]
+        return any(_rows_equal(left, codes2[:, [j for cols2 in pairing for j in cols2]], mode)
+                   for pairing in itertools.product(*(itertools.permutations(cols2) for _, cols2 in groups)))
+    tied1 = np.hstack([np.sort(codes1[:, cols1], axis=1) for cols1, _ in groups])
+    tied2 = np.hstack([np.sort(codes2[:, cols2], axis=1) for _, cols2 in groups])
+    return _rows_equal(tied1, tied2, mode)
+
+
+class ResultSummary:
+    """Bounded-memory stand-in for a result DataFrame: column names, fingerprint and a preview.
+
+    Summaries compare with each other and with DataFrames by fingerprint only, since
+    the rows an exact check needs are not kept; head() serves the prompt preview.
+    """
+
+    def __init__(self, columns: List[str], fingerprint: Fingerprint, preview: pd.DataFrame):
+        self.columns = columns
+        self.fingerprint = fingerprint
+        self.preview = preview
+
+    @property
+    def row_count(self) -> int:
+        return self.fingerprint.rows
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.row_count, len(self.columns)
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        return self.preview.head(n)
+
+    def __repr__(self) -> str:
+        return f"ResultSummary(rows={self.row_count}, columns={self.columns})"
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, preview_rows: int = PREVIEW_ROWS) -> "ResultSummary":
+        return cls(list(df.columns), Fingerprint.of(df), df.head(preview_rows))
+
+    @classmethod
+    def from_cursor(cls, cursor: Any, fetch_rows: int = FETCH_ROWS, preview_rows: int = PREVIEW_ROWS) -> "ResultSummary":
+        """Fold an executed DB-API cursor in fetchmany batches; only the preview rows are kept"""
+        columns = [d[0] for d in cursor.description or []]
+        fp = Fingerprint(len(columns))
+        preview: List[tuple] = []
+        while True:
+            rows = cursor.fetchmany(fetch_rows)
+            if not rows:
+                break
+            if len(preview) < preview_rows:
+                preview.extend(rows[:preview_rows - len(preview)])
+            batch = pd.DataFrame.from_records(rows, columns=range(len(columns)))
+            cols = [column_hashes(batch.iloc[:, i]) for i in range(len(columns))]
+            fp.add([h for h, _ in cols], [p for _, p in cols], len(rows))
+        return cls(columns, fp, pd.DataFrame.from_records(preview, columns=columns))
+
+
+def compare_result(df1: pd.DataFrame | ResultSummary, df2: pd.DataFrame | ResultSummary) -> bool:
+    """Order- and column-order-insensitive multiset equality: fingerprint reject first, results_equal on a match"""
+    if df1.shape != df2.shape:
+        return False
+    fp1 = df1.fingerprint if isinstance(df1, ResultSummary) else Fingerprint.of(df1)
+    fp2 = df2.fingerprint if isinstance(df2, ResultSummary) else Fingerprint.of(df2)
+    if fp1 != fp2:
+        return False
+    if isinstance(df1, ResultSummary) or isinstance(df2, ResultSummary):
+        return True
+    return results_equal(df1, df2, "multiset", ordered_columns=False)
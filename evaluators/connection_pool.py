@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict
+
+
+class ConnectionPool:
+    """Warm SQLite connections kept per thread (and so per worker process) and keyed by database path.
+
+    Each thread holds at most max_per_thread connections; the least recently used one
+    is closed when a new database is opened past the cap. A pooled connection is
+    checked with a trivial query before reuse and replaced if it fails.
+    """
+
+    def __init__(self, connect: Callable[..., sqlite3.Connection], max_per_thread: int = 8, cached_statements: int = 256):
+        self.connect = connect
+        self.max_per_thread = max_per_thread
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "reused": 0, "evicted": 0, "unhealthy": 0}
+
+    def _connections(self) -> "OrderedDict[str, sqlite3.Connection]":
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = OrderedDict()
+        return conns
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    @staticmethod
+    def _healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _close(conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def get(self, db_path: str | Path) -> sqlite3.Connection:
+        key = str(db_path)
+        conns = self._connections()
+        conn = conns.get(key)
+        if conn is not None:
+            if self._healthy(conn):
+                conns.move_to_end(key)
+                self._count("reused")
+                return conn
+            self._close(conns.pop(key))
+            self._count("unhealthy")
+        conn = self.connect(db_path, cached_statements=self.cached_statements)
+        conns[key] = conn
+        self._count("opened")
+        while len(conns) > self.max_per_thread:
+            self._close(conns.popitem(last=False)[1])
+            self._count("evicted")
+        return conn
+
+    def close_thread(self):
+        """Close every connection held by the calling thread"""
+        conns = self._connections()
+        while conns:
+            self._close(conns.popitem()[1])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,106 @@
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import pandas as pd
+
+from .compare import Fingerprint, ResultSummary
+from .result_cache import file_digest, normalize_sql
+
+ARTIFACT_VERSION = 3
+
+
+def gold_sql_of(question: Dict[str, Any]) -> str | None:
+    """Gold SQL of a question: `gold_sql` in annotation sets, `SQL` in BIRD dev/mini_dev"""
+    return question.get("gold_sql") or question.get("SQL")
+
+
+class GoldArtifact:
+    """Precomputed gold SQL outcomes written by precompute.py, keyed by (database digest, normalized SQL).
+
+    Each entry holds the outcome (ok / error / timeout), timing, row count, fingerprint
+    and a preview; full rows are kept unless the result exceeded the row cap, in which
+    case only fingerprint-based (summary) lookups are answered.
+    """
+
+    def __init__(self, entries: Dict[Tuple[str, str], Dict[str, Any]] = None, databases: Dict[str, str] = None):
+        self.entries = entries or {}
+        self.databases = databases or {}
+        self.hits = 0
+
+    @staticmethod
+    def key(db_digest: str, sql: str) -> Tuple[str, str]:
+        return db_digest, normalize_sql(sql)
+
+    def add(self, db_digest: str, entry: Dict[str, Any]):
+        self.databases[entry["db_id"]] = db_digest
+        self.entries[self.key(db_digest, entry["sql"])] = entry
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def save(self, path: str | Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": ARTIFACT_VERSION, "databases": self.databases, "entries": self.entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "GoldArtifact":
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data.get("version") != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported gold artifact version in {path}: {data.get('version')}")
+        return cls(data["entries"], data["databases"])
+
+    def get(self, db_path: str | Path, namespace: str, sql: str, timeout: float) -> Tuple[bool, Any]:
+        """(hit, value) shaped like the executor for namespace: "frame", "summary" or "rows" """
+        try:
+            entry = self.entries.get(self.key(file_digest(db_path), sql))
+        except OSError:
+            return False, None
+        if entry is None:
+            return False, None
+        if entry["outcome"] == "error":
+            value = False
+        elif entry["outcome"] == "timeout":
+            if timeout > entry["timeout"]:
+                return False, None
+            value = None
+        elif namespace == "summary":
+            value = ResultSummary(entry["columns"], entry["fingerprint"], pd.DataFrame.from_records(entry["preview"], columns=entry["columns"]))
+        elif entry["rows"] is None:
+            return False, None
+        elif namespace == "frame":
+            value = pd.DataFrame.from_records(entry["rows"], columns=entry["columns"], coerce_float=True)
+        elif namespace == "rows":
+            value = entry["rows"]
+        else:
+            return False, None
+        self.hits += 1
+        return True, value
+
+
+def build_entry(db_id: str, sql: str, outcome: Any, seconds: float, timeout: float, max_rows: int, preview_rows: int = 20) -> Dict[str, Any]:
+    """Artifact entry from a (columns, rows) execution outcome; False is an error and None a timeout"""
+    entry = {"db_id": db_id, "sql": sql, "seconds": round(seconds, 4), "timeout": timeout}
+    if outcome is None or outcome is False:
+        entry["outcome"] = "timeout" if outcome is None else "error"
+        return entry
+    columns, rows = outcome
+    frame = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    entry.update(
+        outcome="ok",
+        columns=list(columns),
+        row_count=len(rows),
+        fingerprint=Fingerprint.of(frame),
+        preview=[tuple(r) for r in rows[:preview_rows]],
+        rows=[tuple(r) for r in rows] if len(rows) <= max_rows else None,
+    )
+    return entry
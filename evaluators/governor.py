@@ -0,0 +1,183 @@
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List
+
+import openai
+
+from .render import count_tokens
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; reservations may overdraw and are paid back by waiting"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` and return how long the caller must wait before using it"""
+        with self._lock:
+            self._refill()
+            self.level -= min(amount, self.capacity)
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def adjust(self, delta: float):
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level - delta)
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], completion_allowance: int = 1024) -> int:
+    text = "".join(m["content"] if isinstance(m.get("content"), str) else str(m.get("content", "")) for m in messages)
+    return count_tokens(text) + completion_allowance
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except Exception:
+            return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in RETRYABLE_STATUS
+
+
+class RequestGovernor:
+    """Shared gate for LLM calls: per-model RPM/TPM budgets plus jittered exponential backoff that honors Retry-After"""
+
+    def __init__(self, max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._limits: Dict[str, Dict[str, TokenBucket]] = {}
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "retries": 0, "rate_limited": 0, "failures": 0, "throttle_seconds": 0.0, "tokens": 0}
+
+    def configure(self, model: str = "*", rpm: float = None, tpm: float = None):
+        """Set budgets for a model; "*" applies to models without their own entry"""
+        buckets = {}
+        if rpm:
+            buckets["rpm"] = TokenBucket(rpm)
+        if tpm:
+            buckets["tpm"] = TokenBucket(tpm)
+        with self._lock:
+            self._limits[model] = buckets
+
+    def _buckets(self, model: str) -> Dict[str, TokenBucket]:
+        with self._lock:
+            return self._limits.get(model, self._limits.get("*", {}))
+
+    def _reserve(self, model: str, tokens: int) -> float:
+        buckets = self._buckets(model)
+        wait = 0.0
+        if "rpm" in buckets:
+            wait = max(wait, buckets["rpm"].reserve(1))
+        if "tpm" in buckets:
+            wait = max(wait, buckets["tpm"].reserve(tokens))
+        return wait
+
+    def _settle(self, model: str, estimated: int, response: Any):
+        usage = getattr(response, "usage", None)
+        actual = getattr(usage, "total_tokens", None) or estimated
+        tpm = self._buckets(model).get("tpm")
+        if tpm is not None:
+            tpm.adjust(actual - estimated)
+        self._count(requests=1, tokens=actual)
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        self._count(retries=1, rate_limited=int(isinstance(error, openai.RateLimitError) or getattr(error, "status_code", None) == 429))
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+            delay = random.uniform(delay / 2, delay)
+        return delay
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self._counters[key] += value
+
+    def run(self, model: str, estimated_tokens: int, send: Callable[[], Any], tally: Dict[str, Any] = None) -> Any:
+        """Send under the rate budgets, retrying retryable errors; tally (if given) receives retries and throttled seconds"""
+        tally = {} if tally is None else tally
+        tally.update(retries=0, throttled=0.0)
+        for attempt in range(self.max_retries + 1):
+            wait = self._reserve(model, estimated_tokens)
+            tally["retries"] = attempt
+            if wait > 0:
+                tally["throttled"] += wait
+                self._count(throttle_seconds=wait)
+                time.sleep(wait)
+            try:
+                response = send()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self._count(failures=1)
+                    raise
+                time.sleep(self._backoff(e, attempt))
+                continue
+            self._settle(model, estimated_tokens, response)
+            return response
+
+    async def arun(self, model: str, estimated_tokens: int, send: Callable[[], Awaitable[Any]], tally: Dict[str, Any] = None) -> Any:
+        tally = {} if tally is None else tally
+        tally.update(retries=0, throttled=0.0)
+        for attempt in range(self.max_retries + 1):
+            wait = self._reserve(model, estimated_tokens)
+            tally["retries"] = attempt
+            if wait > 0:
+                tally["throttled"] += wait
+                self._count(throttle_seconds=wait)
+                await asyncio.sleep(wait)
+            try:
+                response = await send()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self._count(failures=1)
+                    raise
+                await asyncio.sleep(self._backoff(e, attempt))
+                continue
+            self._settle(model, estimated_tokens, response)
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counters)
+
+
+governor = RequestGovernor()
+
+
+def format_governor_stats() -> str:
+    s = governor.stats()
+    return (f"LLM governor: requests={s['requests']}, retries={s['retries']}, rate_limited={s['rate_limited']}, "
+            f"failures={s['failures']}, throttled={s['throttle_seconds']:.1f}s, tokens={s['tokens']}")
@@ -0,0 +1,136 @@
+import os
+import json
+import atexit
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+def jsonl_path_for(json_path: str | Path) -> Path:
+    return Path(json_path).with_suffix(".jsonl")
+
+
+def read_jsonl(path: str | Path) -> List[Any]:
+    """Read records from a JSONL file, skipping a torn final line left by an interrupted run"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def export_jsonl(jsonl_path: str | Path, json_path: str | Path):
+    """Compact a JSONL log into the JSON array layout read by analyze.py and merge_and_analyze.py"""
+    records = read_jsonl(jsonl_path)
+    tmp = Path(f"{json_path}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, json_path)
+
+
+def _drop_torn_tail(path: Path):
+    """Truncate a log to its last newline, so a record torn by a killed run is not glued to the next append"""
+    if not path.exists():
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(pos, 1 << 16)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            i = chunk.rfind(b"\n")
+            if i >= 0:
+                pos = pos - step + i + 1
+                break
+            pos -= step
+        if pos < end:
+            f.truncate(pos)
+
+
+class JsonlWriter:
+    """Append-only JSONL sink: one line per record, fsync batched by count and time"""
+
+    def __init__(self, path: str | Path, fsync_every: int = 32, fsync_interval: float = 1.0):
+        self.path = Path(path)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        _drop_torn_tail(self.path)
+        self._f = open(self.path, "a", encoding="utf-8")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, record: Any):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self._pending += 1
+            if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            if not self._f.closed:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if not self._f.closed:
+                self._sync()
+                self._f.close()
+
+
+_writers: Dict[Path, tuple] = {}
+_writers_lock = threading.Lock()
+
+
+def get_jsonl_writer(json_path: str | Path) -> JsonlWriter:
+    """Return the single writer for json_path's sibling .jsonl log, migrating an existing JSON array on first use"""
+    json_path = Path(json_path)
+    key = json_path.resolve()
+    with _writers_lock:
+        if key in _writers:
+            return _writers[key][0]
+        jsonl_path = jsonl_path_for(json_path)
+        if not jsonl_path.exists() and json_path.exists():
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    existing = json.load(f)
+            except Exception:
+                existing = []
+            with open(jsonl_path, "w", encoding="utf-8") as f:
+                for record in existing:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        writer = JsonlWriter(jsonl_path)
+        _writers[key] = (writer, json_path)
+        return writer
+
+
+def close_jsonl_writers(export: bool = True):
+    """Flush and close every open writer, then compact each log into its JSON array file"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer, json_path in writers:
+        writer.close()
+        if export:
+            export_jsonl(writer.path, json_path)
+
+
+atexit.register(close_jsonl_writers)
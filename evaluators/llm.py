@@ -0,0 +1,245 @@
+import os
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List
+
+import httpx
+import openai
+from dotenv import load_dotenv
+from .governor import governor, estimate_tokens
+from .llm_cache import LLMResponseCache
+from .accounting import cached_tokens, log_call
+
+load_dotenv()
+
+_settings: Dict[str, Any] = {"pool_size": 16, "api_key": None, "base_url": None, "timeout": 600.0, "cache_hints": False}
+_client: openai.OpenAI | None = None
+_async_clients: Dict[int, openai.AsyncOpenAI] = {}
+_client_lock = threading.Lock()
+_response_cache: LLMResponseCache | None = None
+_usage_sink: ContextVar[List[Dict[str, Any]] | None] = ContextVar("llm_usage_sink", default=None)
+_prompt_tokens = {"requests": 0, "prompt": 0, "cached": 0}
+_prompt_tokens_lock = threading.Lock()
+
+# First question-specific section of every evaluator prompt; everything before it is shared per database
+CACHE_BREAK = "###### Question"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def configure_llm_client(pool_size: int = None, base_url: str = None, api_key: str = None, timeout: float = None,
+                         cache_hints: bool = None):
+    """Set options of the shared client (pool size usually matches --threads); it is rebuilt on next use"""
+    global _client
+    with _client_lock:
+        for key, value in (("pool_size", pool_size), ("base_url", base_url), ("api_key", api_key), ("timeout", timeout),
+                           ("cache_hints", cache_hints)):
+            if value is not None:
+                _settings[key] = value
+        old, _client = _client, None
+        _async_clients.clear()
+    if old is not None:
+        old.close()
+
+
+def enable_llm_cache(path: str, ttl: float = None, max_bytes: int = 1 << 30) -> LLMResponseCache:
+    """Answer byte-identical requests (same model, prompts and parameters) from a persistent cache"""
+    global _response_cache
+    _response_cache = LLMResponseCache(path, ttl=ttl, max_bytes=max_bytes)
+    return _response_cache
+
+
+def format_llm_cache_stats() -> str:
+    if _response_cache is None:
+        return "LLM cache: disabled"
+    stats = _response_cache.stats()
+    return f"LLM cache: hits={stats['hits']}, misses={stats['misses']}"
+
+
+def format_prompt_cache_stats() -> str:
+    with _prompt_tokens_lock:
+        stats = dict(_prompt_tokens)
+    share = stats["cached"] / stats["prompt"] * 100 if stats["prompt"] else 0.0
+    return f"Provider prompt cache: requests={stats['requests']}, prompt tokens={stats['prompt']}, cached={stats['cached']} ({share:.0f}%)"
+
+
+def with_cache_hints(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Mark the system prompt and the shared user prefix (up to CACHE_BREAK) as cacheable with cache_control.
+
+    Providers with automatic prefix caching ignore the hints; the text sent is unchanged.
+    """
+    hinted = []
+    for m in messages:
+        content = m.get("content")
+        if not isinstance(content, str):
+            hinted.append(m)
+            continue
+        cut = len(content) if m.get("role") == "system" else content.find(CACHE_BREAK)
+        if cut <= 0:
+            hinted.append(m)
+            continue
+        parts = [{"type": "text", "text": content[:cut], "cache_control": {"type": "ephemeral"}}]
+        if content[cut:]:
+            parts.append({"type": "text", "text": content[cut:]})
+        hinted.append({**m, "content": parts})
+    return hinted
+
+
+def _request_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return with_cache_hints(messages) if _settings["cache_hints"] else messages
+
+
+def _usage_dict(response: Any) -> Dict[str, Any] | None:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    return usage.model_dump() if hasattr(usage, "model_dump") else dict(usage)
+
+
+@contextmanager
+def record_usage() -> Iterator[List[Dict[str, Any]]]:
+    """Collect the usage of every chat completion made inside the block by this thread or asyncio task"""
+    sink: List[Dict[str, Any]] = []
+    token = _usage_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _usage_sink.reset(token)
+
+
+def _note_usage(response: Any):
+    sink = _usage_sink.get()
+    usage = _usage_dict(response)
+    if usage is not None:
+        with _prompt_tokens_lock:
+            _prompt_tokens["requests"] += 1
+            _prompt_tokens["prompt"] += int(usage.get("prompt_tokens") or 0)
+            _prompt_tokens["cached"] += cached_tokens(usage)
+    if sink is not None and usage is not None:
+        sink.append(usage)
+
+
+def _cache_lookup(model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]) -> tuple[str | None, str | None]:
+    if _response_cache is None:
+        return None, None
+    key = _response_cache.key(model, messages, params)
+    hit = _response_cache.get(key)
+    return key, hit["content"] if hit is not None else None
+
+
+def _cache_store(key: str | None, model: str, content: str | None, response: Any):
+    if _response_cache is not None and key is not None and content is not None:
+        _response_cache.put(key, model, content, _usage_dict(response))
+
+
+def _parsed_hit(key: str, content: str, parse: Callable[[str], Any] | None) -> Any:
+    """Parse a cached response; an entry the caller cannot parse is dropped so the next run asks again"""
+    if parse is None:
+        return content
+    try:
+        return parse(content)
+    except Exception:
+        _response_cache.delete(key)
+        raise
+
+
+def _parsed_store(key: str | None, model: str, content: str | None, response: Any, parse: Callable[[str], Any] | None) -> Any:
+    """Parse a fresh response and cache it only once parsing succeeded"""
+    value = parse(content) if parse is not None else content
+    _cache_store(key, model, content, response)
+    return value
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    return {
+        "api_key": _settings["api_key"] or os.getenv("OPENAI_API_KEY"),
+        "base_url": _settings["base_url"] or os.getenv("OPENAI_BASE_URL"),
+        "timeout": _settings["timeout"],
+        "max_retries": 0,
+    }
+
+
+def _limits() -> httpx.Limits:
+    size = max(1, int(_settings["pool_size"]))
+    return httpx.Limits(max_connections=size, max_keepalive_connections=size, keepalive_expiry=60.0)
+
+
+def get_client() -> openai.OpenAI:
+    """Process-wide OpenAI client whose keep-alive connection pool is shared by all evaluators and threads"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            http_client = openai.DefaultHttpxClient(limits=_limits(), http2=_http2_available())
+            _client = openai.OpenAI(http_client=http_client, **_client_kwargs())
+        return _client
+
+
+def chat_completion(model: str, messages: List[Dict[str, Any]], stage: str = None, question: Dict[str, Any] = None,
+                    parse: Callable[[str], Any] = None, **kwargs) -> Any:
+    """Send one chat completion through the shared client and governor and return the message content.
+
+    stage and question only label the call in the accounting log; they are not sent.
+    With parse, its result is returned instead, and a response it raises on is never cached.
+    """
+    start = time.perf_counter()
+    key, cached = _cache_lookup(model, messages, kwargs)
+    if cached is not None:
+        log_call(model, stage, question, time.perf_counter() - start, cache_hit=True)
+        return _parsed_hit(key, cached, parse)
+    tally: Dict[str, Any] = {}
+    try:
+        response = governor.run(
+            model, estimate_tokens(messages),
+            lambda: get_client().chat.completions.create(model=model, messages=_request_messages(messages), **kwargs),
+            tally,
+        )
+    except Exception as e:
+        log_call(model, stage, question, time.perf_counter() - start, error=str(e), **tally)
+        raise
+    _note_usage(response)
+    log_call(model, stage, question, time.perf_counter() - start, usage=_usage_dict(response), **tally)
+    content = response.choices[0].message.content
+    return _parsed_store(key, model, content, response, parse)
+
+
+def get_async_client() -> openai.AsyncOpenAI:
+    """Async counterpart of get_client, one per running event loop"""
+    loop_id = id(asyncio.get_running_loop())
+    with _client_lock:
+        if loop_id not in _async_clients:
+            http_client = openai.DefaultAsyncHttpxClient(limits=_limits(), http2=_http2_available())
+            _async_clients[loop_id] = openai.AsyncOpenAI(http_client=http_client, **_client_kwargs())
+        return _async_clients[loop_id]
+
+
+async def achat_completion(model: str, messages: List[Dict[str, Any]], stage: str = None, question: Dict[str, Any] = None,
+                           parse: Callable[[str], Any] = None, **kwargs) -> Any:
+    start = time.perf_counter()
+    key, cached = _cache_lookup(model, messages, kwargs)
+    if cached is not None:
+        log_call(model, stage, question, time.perf_counter() - start, cache_hit=True)
+        return _parsed_hit(key, cached, parse)
+    client = get_async_client()
+    tally: Dict[str, Any] = {}
+    try:
+        response = await governor.arun(
+            model, estimate_tokens(messages),
+            lambda: client.chat.completions.create(model=model, messages=_request_messages(messages), **kwargs),
+            tally,
+        )
+    except Exception as e:
+        log_call(model, stage, question, time.perf_counter() - start, error=str(e), **tally)
+        raise
+    _note_usage(response)
+    log_call(model, stage, question, time.perf_counter() - start, usage=_usage_dict(response), **tally)
+    content = response.choices[0].message.content
+    return _parsed_store(key, model, content, response, parse)
@@ -0,0 +1,175 @@
+"""Minimal OpenAI-compatible chat completions (and files/batches) server for local runs and tests.
+
+    python -m evaluators.mock_llm_server --port 8000 --verdict true
+    OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=mock python main.py --input ...
+"""
+import json
+import time
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import default as email_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    verdict = True
+    latency = 0.0
+    # Prefixes marked with cache_control that were already seen, to emulate provider prompt caching
+    cached_prefixes = set()
+    cache_lock = threading.Lock()
+    # Uploaded files and batches of the emulated Batch API; batches complete on creation
+    files = {}
+    batches = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    @staticmethod
+    def _text(content) -> str:
+        if isinstance(content, list):
+            return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return str(content or "")
+
+    def _cached_chars(self, messages: list) -> int:
+        """Length of the prompt up to the last cache_control breakpoint, if that prefix was sent before"""
+        prefix, seen = "", ""
+        for m in messages:
+            for part in (m.get("content") if isinstance(m.get("content"), list) else [{"text": self._text(m.get("content"))}]):
+                prefix += part.get("text", "")
+                if part.get("cache_control"):
+                    seen = prefix
+        if not seen:
+            return 0
+        with self.cache_lock:
+            hit = seen in self.cached_prefixes
+            self.cached_prefixes.add(seen)
+        return len(seen) if hit else 0
+
+    def _completion(self, request: dict) -> dict:
+        content = json.dumps({
+            "verdict": self.verdict,
+            "reason": "mock response",
+            "judgement": "mock response",
+            "ambiguity": "na",
+            "gold_correct": True,
+        })
+        messages = request.get("messages", [])
+        prompt_chars = sum(len(self._text(m.get("content"))) for m in messages)
+        prompt_tokens = max(1, prompt_chars // 4)
+        cached_tokens = self._cached_chars(messages) // 4
+        completion_tokens = max(1, len(content) // 4)
+        return {
+            "id": f"chatcmpl-mock-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens,
+                      "prompt_tokens_details": {"cached_tokens": cached_tokens}},
+        }
+
+    def _store_file(self, data: bytes, filename: str, purpose: str) -> dict:
+        file_id = f"file-mock-{time.time_ns()}"
+        meta = {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed"}
+        with self.cache_lock:
+            self.files[file_id] = (meta, data)
+        return meta
+
+    def _upload(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8")
+        form = BytesParser(policy=email_policy).parsebytes(header + self.rfile.read(length))
+        data, filename, purpose = b"", "upload.jsonl", "batch"
+        for part in form.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                data, filename = part.get_payload(decode=True), part.get_filename() or filename
+            elif name == "purpose":
+                purpose = part.get_content().strip()
+        return self._store_file(data, filename, purpose)
+
+    def _create_batch(self, request: dict) -> dict:
+        _, data = self.files[request["input_file_id"]]
+        lines = []
+        for raw in data.decode("utf-8").splitlines():
+            if raw.strip():
+                line = json.loads(raw)
+                lines.append({"id": f"batch_req_{time.time_ns()}", "custom_id": line["custom_id"], "error": None,
+                              "response": {"status_code": 200, "request_id": "mock", "body": self._completion(line["body"])}})
+        output = self._store_file("".join(json.dumps(l) + "\n" for l in lines).encode("utf-8"), "batch_output.jsonl", "batch_output")
+        now = int(time.time())
+        batch = {"id": f"batch-mock-{time.time_ns()}", "object": "batch", "endpoint": request.get("endpoint"),
+                 "input_file_id": request["input_file_id"], "completion_window": request.get("completion_window", "24h"),
+                 "status": "completed", "output_file_id": output["id"], "error_file_id": None,
+                 "created_at": now, "completed_at": now,
+                 "request_counts": {"total": len(lines), "completed": len(lines), "failed": 0}}
+        with self.cache_lock:
+            self.batches[batch["id"]] = batch
+        return batch
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.endswith("/chat/completions"):
+            request = self._read_json()
+            if self.latency:
+                time.sleep(self.latency)
+            self._send_json(200, self._completion(request))
+        elif path.endswith("/files"):
+            self._send_json(200, self._upload())
+        elif path.endswith("/batches"):
+            request = self._read_json()
+            if request.get("input_file_id") not in self.files:
+                self._send_json(404, {"error": {"message": f"No such file {request.get('input_file_id')}"}})
+            else:
+                self._send_json(200, self._create_batch(request))
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_GET(self):
+        parts = self.path.split("?", 1)[0].strip("/").split("/")
+        if len(parts) >= 2 and parts[-2] == "batches" and parts[-1] in self.batches:
+            self._send_json(200, self.batches[parts[-1]])
+        elif len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content" and parts[-2] in self.files:
+            data = self.files[parts[-2]][1]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, verdict: bool = True, latency: float = 0.0):
+    """Start the server on a background thread; returns (server, base_url)"""
+    handler = type("ConfiguredMockLLMHandler", (MockLLMHandler,), {"verdict": verdict, "latency": latency})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--verdict", type=str, default="true", choices=["true", "false"])
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to sleep before answering")
+    args = parser.parse_args()
+    handler = type("ConfiguredMockLLMHandler", (MockLLMHandler,), {"verdict": args.verdict == "true", "latency": args.latency})
+    print(f"Mock LLM server on http://{args.host}:{args.port}/v1")
+    ThreadingHTTPServer((args.host, args.port), handler).serve_forever()
@@ -0,0 +1,98 @@
+import re
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List
+
+from .sql_tables import tokenize_sql
+
+RISKY_COST = 1e8
+SEARCH_FANOUT = 10
+_LOOP = re.compile(r"^(SCAN|SEARCH) (?:TABLE )?(\S+)")
+
+
+class RowCounts:
+    """Approximate table row counts per database, computed once: sqlite_stat1 when analyzed, else MAX(rowid), else COUNT(*)"""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db_key: str, conn: sqlite3.Connection, table: str) -> int:
+        with self._lock:
+            cached = self._counts.get(db_key, {}).get(table)
+        if cached is not None:
+            return cached
+        count = self._count(conn, table)
+        with self._lock:
+            self._counts.setdefault(db_key, {})[table] = count
+        return count
+
+    @staticmethod
+    def _count(conn: sqlite3.Connection, table: str) -> int:
+        quoted = '"' + table.replace('"', '""') + '"'
+        queries = (
+            ("SELECT stat FROM sqlite_stat1 WHERE tbl = ? AND idx IS NULL", (table,)),
+            (f"SELECT MAX(rowid) FROM {quoted}", ()),
+            (f"SELECT COUNT(*) FROM {quoted}", ()),
+        )
+        for query, params in queries:
+            try:
+                row = conn.execute(query, params).fetchone()
+            except sqlite3.Error:
+                continue
+            if row and row[0] is not None:
+                return int(str(row[0]).split()[0])
+        return 0
+
+
+def table_aliases(sql: str, tables: Dict[str, str]) -> Dict[str, str]:
+    """Map lowercased `table [AS] alias` aliases to table names, for resolving EXPLAIN QUERY PLAN details"""
+    tokens = tokenize_sql(sql)
+    aliases = {}
+    for i, (kind, value) in enumerate(tokens[:-1]):
+        if kind != "ident" or value not in tables:
+            continue
+        j = i + 2 if tokens[i + 1][1] == "as" else i + 1
+        if j < len(tokens) and tokens[j][0] == "ident":
+            aliases[tokens[j][1]] = tables[value]
+    return aliases
+
+
+def estimate_plan(plan: List[tuple], rows_of: Callable[[str], int]) -> Dict[str, Any]:
+    """Nested-loop cost of an EXPLAIN QUERY PLAN.
+
+    Loops (SCAN/SEARCH rows) sharing a parent are nested: a full scan multiplies by the
+    table's rows, an index search by a small fan-out (1 on a rowid/primary key lookup).
+    Two or more full scans in one loop nest mean no join predicate could drive an index
+    lookup, which is flagged as a likely cartesian product.
+    """
+    nests: Dict[int, List[tuple]] = {}
+    for _, parent, _, detail in plan:
+        m = _LOOP.match(detail)
+        if m:
+            nests.setdefault(parent, []).append((m.group(1), m.group(2), detail))
+    cost, full_scans, cartesian = 0.0, 0, False
+    for loops in nests.values():
+        nest_cost, nest_scans = 1.0, 0
+        for op, name, detail in loops:
+            if op == "SCAN":
+                nest_cost *= max(rows_of(name), 1)
+                nest_scans += 1
+            elif "rowid=" not in detail and "PRIMARY KEY" not in detail:
+                nest_cost *= SEARCH_FANOUT
+        cost += nest_cost
+        full_scans += nest_scans
+        cartesian = cartesian or nest_scans >= 2
+    return {"estimated_cost": cost, "full_scans": full_scans, "cartesian": cartesian, "risky": cost >= RISKY_COST}
+
+
+def preflight(conn: sqlite3.Connection, db_key: str, sql: str, tables: Dict[str, str], row_counts: RowCounts) -> Dict[str, Any]:
+    """Estimate a query's cost from its plan without running it; tables maps lowercased names to real ones"""
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    aliases = table_aliases(sql, tables)
+
+    def rows_of(name: str) -> int:
+        table = tables.get(name.lower()) or aliases.get(name.lower())
+        return row_counts.get(db_key, conn, table) if table else 1
+
+    return estimate_plan(plan, rows_of)
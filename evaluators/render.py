@@ -0,0 +1,102 @@
+import math
+from functools import lru_cache
+from typing import Any, List
+
+import pandas as pd
+
+MAX_ROWS = 20
+MAX_COLUMNS = 16
+MAX_CELL_CHARS = 64
+TOKEN_BUDGET = 1500
+TOKEN_ENCODING = "o200k_base"
+_settings = {"max_rows": MAX_ROWS, "max_columns": MAX_COLUMNS, "max_cell_chars": MAX_CELL_CHARS, "token_budget": TOKEN_BUDGET}
+
+
+def configure_render(max_rows: int = None, max_columns: int = None, max_cell_chars: int = None, token_budget: int = None):
+    for key, value in (("max_rows", max_rows), ("max_columns", max_columns),
+                       ("max_cell_chars", max_cell_chars), ("token_budget", token_budget)):
+        if value is not None:
+            _settings[key] = value
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """tiktoken encoder if installed and its BPE file is available, else None"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when available; otherwise the ~4 characters per token estimate"""
+    enc = _encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def _cell(value: Any, width: int) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NULL"
+    if isinstance(value, float):
+        text = format(value, ".10g")
+    elif isinstance(value, bytes):
+        text = f"<{len(value)} bytes>"
+    else:
+        text = str(value)
+    text = text.replace("\\", "\\\\").replace("\n", "\\n").replace("|", "\\|")
+    if len(text) > width:
+        text = f"{text[:width]}...(+{len(text) - width} chars)"
+    return text
+
+
+def _table(columns: List[str], rows: List[tuple], width: int) -> List[str]:
+    lines = [" | ".join(_cell(c, width) for c in columns)]
+    lines.extend(" | ".join(_cell(v, width) for v in row) for row in rows)
+    return lines
+
+
+def render_result(result: Any, max_rows: int = None, max_columns: int = None,
+                  max_cell_chars: int = None, token_budget: int = None) -> str:
+    """Compact pipe-separated table of a query result (DataFrame or ResultSummary) for a prompt.
+
+    Cells longer than max_cell_chars are cut, columns beyond max_columns are dropped and
+    named in a footer, and rows (then cell width) are reduced until the table fits the
+    token budget. The output depends only on the result, so prompts stay cacheable.
+    """
+    if result is None:
+        return "None"
+    max_rows = _settings["max_rows"] if max_rows is None else max_rows
+    max_columns = _settings["max_columns"] if max_columns is None else max_columns
+    width = _settings["max_cell_chars"] if max_cell_chars is None else max_cell_chars
+    budget = _settings["token_budget"] if token_budget is None else token_budget
+
+    total_rows = result.row_count if hasattr(result, "row_count") else len(result)
+    frame = result.head(max_rows) if not isinstance(result, pd.DataFrame) else result.iloc[:max_rows]
+    columns = [str(c) for c in frame.columns]
+    omitted = columns[max_columns:]
+    columns = columns[:max_columns]
+    if total_rows == 0:
+        return f"(0 rows) columns: {', '.join(columns + omitted)}"
+    rows = list(frame.iloc[:, :max_columns].itertuples(index=False, name=None))
+
+    while True:
+        lines = _table(columns, rows, width)
+        notes = []
+        if len(rows) < total_rows:
+            notes.append(f"showing {len(rows)} of {total_rows} rows")
+        if omitted:
+            notes.append(f"{len(omitted)} more columns omitted: {', '.join(omitted)}")
+        if notes:
+            lines.append(f"({'; '.join(notes)})")
+        text = "\n".join(lines)
+        if count_tokens(text) <= budget:
+            return text
+        if len(rows) > 1:
+            rows = rows[:len(rows) // 2]
+        elif width > 8:
+            width //= 2
+        else:
+            return text
@@ -0,0 +1,138 @@
+import os
+import re
+import pickle
+import sqlite3
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\])")
+_digest_memo: Dict[tuple, str] = {}
+_digest_lock = threading.Lock()
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and lowercase everything outside quoted literals/identifiers"""
+    parts = _QUOTED.split(sql.strip())
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", " ", parts[i]).lower()
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def file_digest(path: str | Path) -> str:
+    """Content digest of a database file, memoized on (path, size, mtime)"""
+    st = os.stat(path)
+    memo_key = (str(Path(path).resolve()), st.st_size, st.st_mtime_ns)
+    with _digest_lock:
+        if memo_key in _digest_memo:
+            return _digest_memo[memo_key]
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _digest_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+class ResultCache:
+    """On-disk SQL result cache: pickled payloads indexed by a SQLite catalog, LRU-evicted by total size.
+
+    Entries are keyed by (database content digest, namespace, normalized SQL) and
+    record one of three outcomes: a value, a SQLite error (False) or a timeout (None).
+    Callers only put False for errors SQLite raised, never for worker or transport failures.
+    A cached timeout only answers requests whose timeout is not longer than the
+    one that expired.
+    """
+
+    def __init__(self, cache_dir: str | Path, max_bytes: int = 4 << 30):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.cache_dir / "catalog.sqlite", check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, db_digest TEXT, namespace TEXT, sql TEXT, outcome TEXT, "
+            "timeout REAL, size INTEGER, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(db_digest: str, namespace: str, sql: str) -> str:
+        return hashlib.sha256(f"{db_digest}\0{namespace}\0{normalize_sql(sql)}".encode("utf-8")).hexdigest()
+
+    def _payload_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.pkl"
+
+    def get(self, db_path: str | Path, namespace: str, sql: str, timeout: float) -> Tuple[bool, Any]:
+        key = self._key(file_digest(db_path), namespace, sql)
+        with self._lock:
+            row = self._conn.execute("SELECT outcome, timeout FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+        outcome, cached_timeout = row
+        if outcome == "timeout":
+            if timeout > cached_timeout:
+                return False, None
+            value = None
+        elif outcome == "error":
+            value = False
+        else:
+            try:
+                with open(self._payload_path(key), "rb") as f:
+                    value = pickle.load(f)
+            except Exception:
+                with self._lock:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+                return False, None
+        with self._lock:
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return True, value
+
+    def put(self, db_path: str | Path, namespace: str, sql: str, timeout: float, result: Any):
+        db_digest = file_digest(db_path)
+        key = self._key(db_digest, namespace, sql)
+        size = 0
+        if result is None:
+            outcome = "timeout"
+        elif result is False:
+            outcome = "error"
+        else:
+            outcome = "value"
+            path = self._payload_path(key)
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            size = path.stat().st_size
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, db_digest, namespace, normalize_sql(sql), outcome, timeout, size, time.time()),
+            )
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM entries WHERE size > 0 ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._payload_path(key).unlink(missing_ok=True)
+            total -= size
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,201 @@
+import os
+import json
+import math
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from .utils import _get_db_path
+
+DIFFICULTY_WEIGHT = {"simple": 1.0, "moderate": 2.0, "challenging": 3.0}
+_db_size_mb: Dict[str, float] = {}
+
+
+def _database_size_mb(db_id: str) -> float:
+    if db_id not in _db_size_mb:
+        try:
+            _db_size_mb[db_id] = os.path.getsize(_get_db_path(db_id)) / (1 << 20)
+        except OSError:
+            _db_size_mb[db_id] = 0.0
+    return _db_size_mb[db_id]
+
+
+def _heuristic_cost(question: Dict[str, Any]) -> float:
+    """Unitless database size x difficulty score"""
+    weight = DIFFICULTY_WEIGHT.get(str(question.get("difficulty", "")).lower(), 1.5)
+    return (1.0 + math.log1p(_database_size_mb(question.get("db_id", "")))) * weight
+
+
+def calibrate_cost(questions: Iterable[Dict[str, Any]], history: Dict[str, float] = None) -> float:
+    """Seconds per heuristic unit, so heuristic estimates share the units of measured latencies.
+
+    Fit on the questions that have a recorded latency; when none of them do, match the mean
+    heuristic of these questions to the mean historical latency. 1.0 without history.
+    """
+    if not history:
+        return 1.0
+    questions = list(questions)
+    known = [q for q in questions if str(q.get("question_id")) in history]
+    if known:
+        seconds = sum(history[str(q.get("question_id"))] for q in known)
+        units = sum(_heuristic_cost(q) for q in known)
+    else:
+        seconds = sum(history.values()) / len(history)
+        units = sum(_heuristic_cost(q) for q in questions) / len(questions) if questions else 0.0
+    return seconds / units if seconds > 0 and units > 0 else 1.0
+
+
+def estimate_cost(question: Dict[str, Any], history: Dict[str, float] = None, scale: float = 1.0) -> float:
+    """Expected seconds for a question: its latency in a previous run, else the heuristic times scale (see calibrate_cost)"""
+    qid = str(question.get("question_id"))
+    if history and qid in history:
+        return history[qid]
+    return _heuristic_cost(question) * scale
+
+
+def cost_model(questions: Iterable[Dict[str, Any]], history: Dict[str, float] = None) -> Callable[[Dict[str, Any]], float]:
+    """estimate_cost with the heuristic calibrated against history for these questions"""
+    scale = calibrate_cost(questions, history)
+    return lambda q: estimate_cost(q, history, scale)
+
+
+def prioritize(items: Iterable[Any], cost: Callable[[Any], float]) -> List[Any]:
+    """Longest-expected-first order, so expensive items do not start last and stretch the tail"""
+    return sorted(items, key=cost, reverse=True)
+
+
+def group_by_affinity(items: Iterable[Any], group: Callable[[Any], str], cost: Callable[[Any], float] = None) -> List[Any]:
+    """Items arranged group after group (largest total cost first), each group in cost order"""
+    groups = _build_groups(items, group, cost)
+    return [item for g in groups.values() for item in g["items"]]
+
+
+def _build_groups(items: Iterable[Any], group: Callable[[Any], str], cost: Callable[[Any], float] = None) -> Dict[str, Dict[str, Any]]:
+    groups: Dict[str, Dict[str, Any]] = {}
+    for item in (prioritize(items, cost) if cost else items):
+        g = groups.setdefault(group(item), {"items": deque(), "cost": 0.0})
+        g["items"].append(item)
+        g["cost"] += cost(item) if cost else 1.0
+    return dict(sorted(groups.items(), key=lambda kv: kv[1]["cost"], reverse=True))
+
+
+class AffinityQueue:
+    """Work queue that keeps each worker on one group (database) while it has work.
+
+    A worker whose group runs dry claims the costliest group nobody is working on;
+    only when every remaining group is claimed does it join the one with the most
+    items left, so groups are interleaved just enough to keep all workers busy.
+    """
+
+    def __init__(self, items: Iterable[Any], group: Callable[[Any], str], cost: Callable[[Any], float] = None):
+        self._groups = _build_groups(items, group, cost)
+        self._workers: Dict[int, str] = {}
+        self._claims: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.switches = 0
+
+    def _assign(self, worker: int, name: str | None):
+        old = self._workers.pop(worker, None)
+        if old is not None:
+            self._claims[old] -= 1
+        if name is not None:
+            self._workers[worker] = name
+            self._claims[name] = self._claims.get(name, 0) + 1
+            self.switches += old is not None and old != name
+
+    def get(self, worker: int) -> Any:
+        """Next item for worker; raises queue.Empty when all groups are drained"""
+        with self._lock:
+            name = self._workers.get(worker)
+            if name is None or not self._groups.get(name, {}).get("items"):
+                live = [(n, g) for n, g in self._groups.items() if g["items"]]
+                if not live:
+                    self._assign(worker, None)
+                    raise queue.Empty
+                free = [n for n, _ in live if not self._claims.get(n)]
+                name = free[0] if free else max(live, key=lambda ng: len(ng[1]["items"]))[0]
+                self._assign(worker, name)
+            return self._groups[name]["items"].popleft()
+
+
+def load_latency_history(path: str) -> Dict[str, float]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {str(k): float(v) for k, v in json.load(f).items()}
+    except Exception:
+        return {}
+
+
+def save_latency_history(path: str, history: Dict[str, float], durations: Dict[str, float]):
+    merged = {**history, **durations}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(merged, f, ensure_ascii=False, indent=2)
+
+
+def run_queue(items: Iterable[Any], process: Callable[[Any], Any], num_workers: int,
+              cost: Callable[[Any], float] = None, key: Callable[[Any], str] = None,
+              on_done: Callable[[Any], None] = None, group: Callable[[Any], str] = None) -> Tuple[List[Any], Dict[str, Any]]:
+    """Run items on num_workers threads that all pull from one shared queue until it is empty.
+
+    Items are enqueued most-expensive-first when `cost` is given; with `group` (e.g. the
+    db_id) an AffinityQueue keeps each worker on one group at a time. Returns the results
+    (completion order) and a report with wall time, per-worker utilization and, when
+    `key` is given, per-item durations for the next run's latency history.
+    """
+    if group is not None:
+        work = AffinityQueue(items, group, cost)
+        next_item = work.get
+    else:
+        work = queue.Queue()
+        for item in (prioritize(items, cost) if cost else items):
+            work.put(item)
+        next_item = lambda _: work.get_nowait()
+    results: List[Any] = []
+    durations: Dict[str, float] = {}
+    workers = [{"worker": i, "items": 0, "busy_seconds": 0.0} for i in range(num_workers)]
+    lock = threading.Lock()
+
+    def worker(idx):
+        stats = workers[idx]
+        while True:
+            try:
+                item = next_item(idx)
+            except queue.Empty:
+                return
+            t0 = time.monotonic()
+            res = process(item)
+            elapsed = time.monotonic() - t0
+            stats["items"] += 1
+            stats["busy_seconds"] += elapsed
+            with lock:
+                results.append(res)
+                if key is not None:
+                    durations[key(item)] = round(elapsed, 3)
+            if on_done is not None:
+                on_done(res)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        for f in [executor.submit(worker, i) for i in range(num_workers)]:
+            f.result()
+    wall = time.monotonic() - start
+    for stats in workers:
+        stats["busy_seconds"] = round(stats["busy_seconds"], 3)
+        stats["utilization"] = round(stats["busy_seconds"] / wall, 3) if wall > 0 else 0.0
+    report = {"wall_seconds": round(wall, 3), "workers": workers, "durations": durations}
+    if group is not None:
+        report["group_switches"] = work.switches
+    return results, report
+
+
+def format_utilization(report: Dict[str, Any]) -> str:
+    workers = report["workers"]
+    mean = sum(w["utilization"] for w in workers) / len(workers) if workers else 0.0
+    per_worker = ", ".join(f"w{w['worker']}={w['utilization'] * 100:.0f}%/{w['items']}" for w in workers)
+    switches = f", group switches={report['group_switches']}" if "group_switches" in report else ""
+    return f"Scheduler: wall={report['wall_seconds']:.1f}s, mean utilization={mean * 100:.0f}%{switches} ({per_worker})"
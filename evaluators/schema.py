@@ -0,0 +1,145 @@
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List
+
+
+class DatabaseSchema:
+    """Tables, columns, primary/foreign keys and descriptions of one database, with pre-rendered prompt lines"""
+
+    def __init__(self, db_id: str, tables: Dict[str, Dict[str, Any]]):
+        self.db_id = db_id
+        self.tables = tables
+        self.table_names = sorted(tables)
+        self.table_index = {t.lower(): t for t in tables}
+        self._schema_lines = {t: self._schema_line(t, info) for t, info in tables.items()}
+        self._descriptions = {t: self._description(t, info["descriptions"]) for t, info in tables.items() if info.get("descriptions") is not None}
+
+    @staticmethod
+    def _schema_line(table: str, info: Dict[str, Any]) -> str:
+        col_definitions = []
+        for name, col_type, pk in info["columns"]:
+            col_def = f"{name} {col_type}"
+            if pk: col_def += " PRIMARY KEY"
+            if name in info["foreign_keys"]: col_def += f" foreign key({info['foreign_keys'][name]})"
+            col_definitions.append(col_def)
+        return f"{table} ({', '.join(col_definitions)})\n"
+
+    @staticmethod
+    def _description(table: str, columns: List[Dict[str, Any]]) -> str:
+        table_desc = f"-- Table: {table}\n"
+        for col in columns:
+            col_name, col_desc, val_desc = col.get("column_name"), col.get("column_description"), col.get("value_description")
+            if col_desc and val_desc:
+                table_desc += f"  {col_name}: {col_desc}; value_description: {val_desc}\n"
+            elif col_desc:
+                table_desc += f"  {col_name}: {col_desc}\n"
+            elif val_desc:
+                table_desc += f"  {col_name}: {val_desc}\n"
+        return table_desc
+
+    def render(self, tables: Iterable[str]) -> str:
+        """Render the db_info prompt block for the given tables"""
+        wanted = set(tables)
+        tables = [t for t in self.table_names if t in wanted]
+        schema_lines = [self._schema_lines[t] for t in tables]
+        descriptions = [self._descriptions[t] for t in tables if t in self._descriptions]
+        result = f"Database: {self.db_id}\n"
+        if schema_lines: result += "Schema:\n" + "\n".join(schema_lines) + "\n\n"
+        if descriptions: result += "Descriptions:\n" + "\n".join(descriptions)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"db_id": self.db_id, "tables": self.tables}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DatabaseSchema":
+        tables = {t: {**info, "columns": [tuple(c) for c in info["columns"]]} for t, info in data["tables"].items()}
+        return cls(data["db_id"], tables)
+
+
+class SchemaCatalog:
+    """Schemas built once per db_id (one connection, one description parse) and served from memory.
+
+    With cache_dir set, built schemas are also stored as JSON and reused while the
+    database and description files keep their size and mtime.
+    """
+
+    def __init__(self, db_path_for: Callable[[str], Path], connect: Callable[[Path], sqlite3.Connection] = sqlite3.connect,
+                 description_dir: str | Path = "data/description", cache_dir: str | Path = None):
+        self.db_path_for = db_path_for
+        self.connect = connect
+        self.description_dir = Path(description_dir)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._schemas: Dict[str, DatabaseSchema] = {}
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, db_id: str) -> List[Any]:
+        parts = []
+        for path in (self.db_path_for(db_id), self.description_dir / f"{db_id}_schema.json"):
+            st = os.stat(path) if os.path.exists(path) else None
+            parts.append([st.st_size, st.st_mtime_ns] if st else None)
+        return parts
+
+    def _load_cached(self, db_id: str) -> DatabaseSchema | None:
+        cache_file = self.cache_dir / f"{db_id}.schema.json"
+        if not cache_file.exists():
+            return None
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("fingerprint") != self._fingerprint(db_id):
+                return None
+            return DatabaseSchema.from_dict(data)
+        except Exception:
+            return None
+
+    def _store_cached(self, schema: DatabaseSchema):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_dir / f"{schema.db_id}.schema.json", "w", encoding="utf-8") as f:
+            json.dump({**schema.to_dict(), "fingerprint": self._fingerprint(schema.db_id)}, f, ensure_ascii=False)
+
+    def _build(self, db_id: str) -> DatabaseSchema:
+        tables: Dict[str, Dict[str, Any]] = {}
+        with self.connect(self.db_path_for(db_id)) as conn:
+            cur = conn.cursor()
+            names = [row[0] for row in cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name;").fetchall()]
+            for table in names:
+                table_info = cur.execute(f"PRAGMA table_info('{table}');").fetchall()
+                fk_info = cur.execute(f"PRAGMA foreign_key_list('{table}');").fetchall()
+                tables[table] = {
+                    "columns": [(col[1], col[2], col[5]) for col in table_info],
+                    "foreign_keys": {fk[3]: f"{fk[2]}.{fk[4]}" for fk in fk_info},
+                    "descriptions": None,
+                }
+        desc_file = self.description_dir / f"{db_id}_schema.json"
+        if desc_file.exists():
+            with open(desc_file, 'r', encoding='utf-8') as f:
+                schema_data = json.load(f)
+            for table in tables:
+                if table in schema_data:
+                    tables[table]["descriptions"] = schema_data[table]
+        return DatabaseSchema(db_id, tables)
+
+    def get(self, db_id: str) -> DatabaseSchema:
+        with self._lock:
+            schema = self._schemas.get(db_id)
+        if schema is not None:
+            return schema
+        schema = self._load_cached(db_id) if self.cache_dir else None
+        if schema is None:
+            schema = self._build(db_id)
+            if self.cache_dir:
+                self._store_cached(schema)
+        with self._lock:
+            return self._schemas.setdefault(db_id, schema)
+
+    def build(self, db_ids: Iterable[str]):
+        """Warm the catalog for every database a run will touch"""
+        for db_id in sorted(set(db_ids)):
+            try:
+                self.get(db_id)
+            except Exception as e:
+                print(f"Schema catalog build failed for db={db_id}: {e}")
@@ -0,0 +1,49 @@
+import threading
+from typing import Any, Dict, List
+
+
+def usage_tokens(usages: List[Dict[str, Any]]) -> int:
+    return sum(int(u.get("total_tokens") or 0) for u in usages)
+
+
+class SpeculationStats:
+    """Outcome of speculative Refuter dispatch: tokens spent on discarded calls against latency saved on used ones.
+
+    A used speculation saves min(prover, refuter) seconds over the sequential cascade;
+    a discarded one wastes the Refuter's tokens (cancelled calls report none).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {"launched": 0, "used": 0, "discarded": 0, "cancelled": 0,
+                          "used_tokens": 0, "wasted_tokens": 0, "saved_seconds": 0.0}
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self._counters[key] += value
+
+    def launched(self):
+        self._count(launched=1)
+
+    def used(self, prover_seconds: float, refuter_seconds: float, usages: List[Dict[str, Any]]):
+        self._count(used=1, used_tokens=usage_tokens(usages), saved_seconds=min(prover_seconds, refuter_seconds))
+
+    def discarded(self, usages: List[Dict[str, Any]]):
+        self._count(discarded=1, wasted_tokens=usage_tokens(usages))
+
+    def cancelled(self):
+        self._count(cancelled=1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counters)
+
+
+speculation_stats = SpeculationStats()
+
+
+def format_speculation_stats() -> str:
+    s = speculation_stats.stats()
+    return (f"Speculative Refuter: launched={s['launched']}, used={s['used']}, discarded={s['discarded']}, "
+            f"cancelled={s['cancelled']}, wasted tokens={s['wasted_tokens']}, latency saved={s['saved_seconds']:.1f}s")
@@ -0,0 +1,131 @@
+import re
+from functools import lru_cache
+from typing import FrozenSet, List, Tuple
+
+_TOKEN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<qident>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)
+  | (?P<punct>.)
+""", re.S | re.X)
+
+KEYWORDS = frozenset("""
+    select from where group by order having limit offset join inner left right full outer cross natural on using
+    union all intersect except distinct as and or not in is null like glob between case when then else end exists
+    with recursive values asc desc collate cast window over partition rows range filter escape match regexp
+""".split())
+_FROM_CLAUSE = {"from", "join"}
+_OTHER_CLAUSE = {"select", "where", "group", "order", "having", "limit", "on", "using", "union", "intersect", "except", "window", "values"}
+# Keywords that can open a FROM item themselves; any other keyword there is a table spelled like one (e.g. `Match`)
+_FROM_ITEM_KEYWORDS = {"select", "values", "with"}
+
+
+def tokenize_sql(sql: str) -> List[Tuple[str, str]]:
+    """(kind, value) tokens without whitespace/comments; identifiers are unquoted and lowercased"""
+    tokens = []
+    for m in _TOKEN.finditer(sql):
+        kind, value = m.lastgroup, m.group()
+        if kind in ("ws", "comment"):
+            continue
+        if kind == "qident":
+            value = value[1:-1].replace('""', '"') if value[0] == '"' else value[1:-1]
+            tokens.append(("ident", value.lower()))
+        elif kind == "ident":
+            low = value.lower()
+            tokens.append(("keyword" if low in KEYWORDS else "ident", low))
+        else:
+            tokens.append((kind, value))
+    return tokens
+
+
+def _cte_names(tokens: List[Tuple[str, str]]) -> set:
+    """Names defined as `name AS (` or `name(cols) AS (` in a WITH clause"""
+    names = set()
+    for i, (kind, value) in enumerate(tokens):
+        if kind != "ident":
+            continue
+        j = i + 1
+        if j < len(tokens) and tokens[j][1] == "(":
+            depth = 0
+            while j < len(tokens):
+                depth += {"(": 1, ")": -1}.get(tokens[j][1], 0)
+                j += 1
+                if depth == 0:
+                    break
+        if j + 1 < len(tokens) and tokens[j][1] == "as" and tokens[j + 1][1] == "(":
+            names.add(value)
+    return names
+
+
+@lru_cache(maxsize=16384)
+def extract_table_refs(sql: str) -> FrozenSet[str]:
+    """Lowercased names referenced as tables: in FROM/JOIN position or as a `name.column` qualifier.
+
+    Aliases (`AS x`, `FROM t x`, `(...) x`) and CTE names are excluded, so an alias or
+    column that happens to equal a table name, or a table name that is a substring
+    of another identifier, does not count as a mention. Words spelled like keywords
+    still count in those positions, since tables such as `Match` exist.
+    """
+    tokens = tokenize_sql(sql)
+    ctes = _cte_names(tokens)
+    aliases, table_pos, qualifiers = set(), set(), set()
+    clause = [None]
+    seen: List[Tuple[str, str]] = []
+    for i, (kind, value) in enumerate(tokens):
+        # Previous token with its reclassified kind, so `m` in `FROM Match m` is an alias
+        prev = seen[-1] if seen else ("", "")
+        nxt = tokens[i + 1][1] if i + 1 < len(tokens) else ""
+        from_item = prev[1] in _FROM_CLAUSE or (prev[1] in (",", "(") and clause[-1] == "from")
+        if kind == "keyword" and prev[1] != "." and (nxt == "." or (from_item and value not in _FROM_ITEM_KEYWORDS)):
+            kind = "ident"
+        seen.append((kind, value))
+        if kind == "keyword":
+            if value in _FROM_CLAUSE:
+                clause[-1] = "from"
+            elif value in _OTHER_CLAUSE:
+                clause[-1] = value
+            continue
+        if value == "(":
+            clause.append("from" if clause[-1] == "from" and prev[1] in ("from", "join", ",", "(") else None)
+            continue
+        if value == ")":
+            if len(clause) > 1:
+                clause.pop()
+            continue
+        if value == "," and clause[-1] in ("on", "using"):
+            # `JOIN b ON a.x = b.x, c`: the comma ends the join condition and starts a new FROM item
+            clause[-1] = "from"
+            continue
+        if kind != "ident":
+            continue
+        if nxt == "." and prev[1] != ".":
+            qualifiers.add(value)
+        elif from_item:
+            table_pos.add(value)
+        elif prev[1] == "as" or prev[0] == "ident" or prev[1] == ")":
+            aliases.add(value)
+    return frozenset((table_pos | (qualifiers - aliases)) - ctes)
+
+
+@lru_cache(maxsize=16384)
+def extract_identifiers(sql: str) -> FrozenSet[str]:
+    """Every lowercased word token, keyword-spelled ones included; a coarse fallback when no table reference is recognized"""
+    return frozenset(value for kind, value in tokenize_sql(sql) if kind in ("ident", "keyword"))
+
+
+@lru_cache(maxsize=16384)
+def has_top_level_order_by(sql: str) -> bool:
+    """True when the outermost query sorts its output (ORDER BY outside any parentheses)"""
+    depth = 0
+    tokens = tokenize_sql(sql)
+    for i, (kind, value) in enumerate(tokens):
+        if value == "(":
+            depth += 1
+        elif value == ")":
+            depth -= 1
+        elif depth == 0 and value == "order" and kind == "keyword" and i + 1 < len(tokens) and tokens[i + 1][1] == "by":
+            return True
+    return False
@@ -6,16 +6,127 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import threading
-from pandas.util import hash_pandas_object
+import atexit
+import time
 from typing import Dict, List, Callable, Any
 import multiprocessing as mp
+from .result_cache import ResultCache
+from .gold_cache import GoldArtifact
+from .schema import SchemaCatalog
+from .connection_pool import ConnectionPool
+from .preflight import RowCounts, preflight
+from .compare import compare_result, ResultSummary
+from .sql_tables import extract_table_refs, extract_identifiers
+from .jsonl import get_jsonl_writer, jsonl_path_for, read_jsonl, close_jsonl_writers
 
 def _get_db_path(db_id: str) -> Path:
     return Path("dev_databases") / db_id / f"{db_id}.sqlite"
 
+EXEC_MODES = ("process", "inprocess")
+_exec_mode = "process"
+_exec_stats = {"calls": 0, "ok": 0, "errors": 0, "timeouts": 0, "cache_hits": 0, "seconds": 0.0}
+_exec_stats_lock = threading.Lock()
+_deadline = threading.local()
+_sql_failure = threading.local()
+
+def set_exec_mode(mode: str):
+    """Select how run_with_timeout enforces timeouts: a pooled worker process or an in-process progress handler"""
+    global _exec_mode
+    if mode not in EXEC_MODES:
+        raise ValueError(f"Unknown exec mode: {mode}")
+    _exec_mode = mode
+
+def get_exec_stats() -> Dict[str, Any]:
+    with _exec_stats_lock:
+        return {"mode": _exec_mode, **_exec_stats}
+
+def format_exec_stats() -> str:
+    stats = get_exec_stats()
+    avg = stats["seconds"] / stats["calls"] if stats["calls"] else 0.0
+    return (f"SQL exec [{stats['mode']}]: calls={stats['calls']}, ok={stats['ok']}, errors={stats['errors']}, "
+            f"timeouts={stats['timeouts']}, cache_hits={stats['cache_hits']}, total={stats['seconds']:.1f}s, avg={avg * 1000:.1f}ms")
+
+_result_cache: ResultCache | None = None
+
+def enable_result_cache(cache_dir: str | Path, max_bytes: int = 4 << 30) -> ResultCache:
+    """Consult an on-disk result cache in run_with_timeout for functions marked with sql_cacheable"""
+    global _result_cache
+    _result_cache = ResultCache(cache_dir, max_bytes=max_bytes)
+    return _result_cache
+
+_gold_cache: GoldArtifact | None = None
+
+def enable_gold_cache(path: str | Path) -> GoldArtifact:
+    """Answer run_with_timeout calls for precomputed gold SQL (see precompute.py) from the artifact at path"""
+    global _gold_cache
+    _gold_cache = GoldArtifact.load(path)
+    return _gold_cache
+
+def sql_cacheable(namespace: str, resolve_db: Callable[[Any], str | Path] = None):
+    """Mark a (db, sql) -> result function as cacheable; namespace separates result shapes (frames, rows)"""
+    def decorate(func):
+        func.cache_namespace = namespace
+        func.resolve_db = resolve_db or (lambda db: Path(db) if isinstance(db, Path) else _get_db_path(db))
+        return func
+    return decorate
+
+def _deadline_handler() -> int:
+    deadline = getattr(_deadline, "value", None)
+    if deadline is not None and time.monotonic() > deadline:
+        _deadline.expired = True
+        return 1
+    return 0
+
+READ_ONLY_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA temp_store = MEMORY",
+    f"PRAGMA mmap_size = {1 << 30}",
+    "PRAGMA cache_size = -65536",
+)
+
+def connect_readonly(db_path: str | Path, cached_statements: int = 128) -> sqlite3.Connection:
+    """Open a benchmark database read-only and immutable (no file locks or change detection), with mmap and a 64 MiB page cache"""
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro&immutable=1"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=cached_statements)
+    for pragma in READ_ONLY_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+connection_pool = ConnectionPool(connect_readonly)
+
+def configure_connection_pool(max_per_thread: int = None, cached_statements: int = None):
+    """Adjust the per-thread connection cap and prepared-statement cache size of the evaluation pool"""
+    if max_per_thread is not None:
+        connection_pool.max_per_thread = max_per_thread
+    if cached_statements is not None:
+        connection_pool.cached_statements = cached_statements
+
+def connect_db(db_path: str | Path) -> sqlite3.Connection:
+    """Warm pooled evaluation connection for this thread; under an in-process deadline the query is aborted once it expires"""
+    conn = connection_pool.get(db_path)
+    if getattr(_deadline, "value", None) is not None:
+        conn.set_progress_handler(_deadline_handler, 10000)
+    else:
+        conn.set_progress_handler(None, 0)
+    return conn
+
+def _mark_sql_error(e: Exception):
+    """Note whether the failure about to be returned as False was raised by SQLite itself"""
+    _sql_failure.value = isinstance(e, (sqlite3.Error, pd.errors.DatabaseError))
+
+def _call(func: Callable[..., Any], args: tuple, kwargs: dict) -> tuple:
+    """(result, sql_error): exceptions become False, and sql_error tells a SQLite error from any other failure"""
+    _sql_failure.value = False
+    try:
+        res = func(*args, **kwargs)
+    except Exception as e:
+        _mark_sql_error(e)
+        res = False
+    return res, res is False and _sql_failure.value
+
 def _execute_db_query(db_id: str, query: str, params: tuple = None):
     db_path = _get_db_path(db_id)
-    with sqlite3.connect(db_path) as conn:
+    with connect_db(db_path) as conn:
         cur = conn.cursor()
         if params:
             return cur.execute(query, params).fetchall()
@@ -35,64 +146,243 @@ def extract_json_from_response(response: str) -> str:
                 return extracted
     return response
 
+@sql_cacheable("frame")
 def execute_sql(db: str | Path, sql: str) -> pd.DataFrame | bool:
     db_path = Path(db) if isinstance(db, Path) else _get_db_path(db)
     try:
-        with sqlite3.connect(db_path) as conn:
+        with connect_db(db_path) as conn:
             return pd.read_sql_query(sql, conn)
     except Exception as e:
+        _mark_sql_error(e)
         print(f"SQL execution failed for db={db}, sql={sql[:100]}..., error: {e}")
         return False
 
-def compare_result(df1: pd.DataFrame, df2: pd.DataFrame) -> bool:
-    if df1.shape != df2.shape:
+@sql_cacheable("summary")
+def execute_sql_summary(db: str | Path, sql: str) -> ResultSummary | bool:
+    """Like execute_sql, but streams the cursor into a ResultSummary so memory stays bounded"""
+    db_path = Path(db) if isinstance(db, Path) else _get_db_path(db)
+    try:
+        with connect_db(db_path) as conn:
+            return ResultSummary.from_cursor(conn.execute(sql))
+    except Exception as e:
+        _mark_sql_error(e)
+        print(f"SQL execution failed for db={db}, sql={sql[:100]}..., error: {e}")
         return False
-    return hash_dataframe(df1) == hash_dataframe(df2)
 
-def hash_dataframe(df: pd.DataFrame) -> int:
-    df_str = df.map(str)
-    row_hash = None
-    for col in df_str.columns:
-        h_col = hash_pandas_object(df_str[col], index=False).to_numpy()
-        row_hash = h_col if row_hash is None else np.bitwise_xor(row_hash, h_col)
-    return int(np.bitwise_xor.reduce(row_hash))
+def _pool_worker(conn):
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        func, args, kwargs = task
+        res = _call(func, args, kwargs)
+        try:
+            conn.send(res)
+        except Exception:
+            conn.send((False, False))
 
-def _worker(q: mp.Queue, func: Callable[..., Any], args: tuple, kwargs: dict):
-    try:
-        res = func(*args, **kwargs)
-        q.put(res)
-    except Exception:
-        q.put(False)
 
-def run_with_timeout(func: Callable[..., Any], *args, timeout: float = 2.0, **kwargs) -> Any:
-    ctx = mp.get_context("spawn")
-    q: mp.Queue = ctx.Queue(maxsize=1)
-    p = ctx.Process(target=_worker, args=(q, func, args, kwargs), daemon=True)
-    p.start()
-    p.join(timeout)
-    if p.is_alive():
+class WorkerPool:
+    """Long-lived pool of spawned executor processes reused across run_with_timeout calls"""
+
+    def __init__(self, max_idle: int = None):
+        self.max_idle = max_idle or os.cpu_count() or 1
+        self._ctx = mp.get_context("spawn")
+        self._idle = []
+        self._affinity: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _spawn(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        p = self._ctx.Process(target=_pool_worker, args=(child_conn,), daemon=True)
+        p.start()
+        child_conn.close()
+        return p, parent_conn
+
+    def warm(self, size: int):
+        """Start workers up front so the first queries do not pay interpreter startup"""
+        with self._lock:
+            missing = max(0, min(size, self.max_idle) - len(self._idle))
+        workers = [self._spawn() for _ in range(missing)]
+        with self._lock:
+            self._idle.extend(workers)
+
+    def _acquire(self, affinity: str = None):
+        """An idle worker, preferring one that last served the same affinity key (database)"""
+        with self._lock:
+            if affinity is not None:
+                for i in range(len(self._idle) - 1, -1, -1):
+                    if self._affinity.get(self._idle[i][0].pid) == affinity and self._idle[i][0].is_alive():
+                        return self._idle.pop(i)
+            while self._idle:
+                p, conn = self._idle.pop()
+                if p.is_alive():
+                    return p, conn
+                self._affinity.pop(p.pid, None)
+                conn.close()
+        return self._spawn()
+
+    def _release(self, worker):
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(worker)
+                return
+        self._stop(worker)
+
+    def _kill(self, worker):
+        p, conn = worker
+        with self._lock:
+            self._affinity.pop(p.pid, None)
         p.terminate()
         p.join()
-        return None
+        conn.close()
+
+    @staticmethod
+    def _stop(worker):
+        p, conn = worker
+        try:
+            conn.send(None)
+        except Exception:
+            pass
+        p.join(1)
+        if p.is_alive():
+            p.terminate()
+            p.join()
+        conn.close()
+
+    def run(self, func: Callable[..., Any], args: tuple, kwargs: dict, timeout: float, affinity: str = None) -> tuple:
+        """(result, sql_error) as from _call; (None, False) on timeout and (False, False) when the worker or pipe fails"""
+        worker = self._acquire(affinity)
+        p, conn = worker
+        try:
+            conn.send((func, args, kwargs))
+            if not conn.poll(timeout):
+                self._kill(worker)
+                return None, False
+            res = conn.recv()
+        except Exception:
+            self._kill(worker)
+            return False, False
+        if affinity is not None:
+            with self._lock:
+                self._affinity[p.pid] = affinity
+        self._release(worker)
+        return res
+
+    def drain(self):
+        """Stop the idle workers (and with them their database connections); the pool stays usable"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._affinity.clear()
+        for worker in idle:
+            self._stop(worker)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self.drain()
+
+
+_worker_pool: WorkerPool | None = None
+_worker_pool_lock = threading.Lock()
+
+def get_worker_pool() -> WorkerPool:
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = WorkerPool()
+            atexit.register(_worker_pool.close)
+        return _worker_pool
+
+def init_worker_pool(size: int) -> WorkerPool:
+    """Size the shared pool for `size` concurrent callers and pre-warm its workers"""
+    pool = get_worker_pool()
+    pool.max_idle = max(pool.max_idle, size)
+    pool.warm(size)
+    return pool
+
+def _run_in_process(func: Callable[..., Any], args: tuple, kwargs: dict, timeout: float) -> tuple:
+    _deadline.value = time.monotonic() + timeout
+    _deadline.expired = False
     try:
-        return q.get_nowait()
-    except Exception:
-        return False
+        res, sql_error = _call(func, args, kwargs)
+    finally:
+        _deadline.value = None
+    return (None, False) if _deadline.expired else (res, sql_error)
 
-def save_json(data, output_file, append=False):
-    if not hasattr(save_json, "_lock"):
-        save_json._lock = threading.Lock()  
-    with save_json._lock: 
-        if append:
-            existing_data = json.load(open(output_file, encoding="utf-8")) if os.path.exists(output_file) else []
-            existing_data.append(data)
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(existing_data, f, ensure_ascii=False, indent=2)
+def _record_exec(res: Any, seconds: float, cache_hit: bool = False):
+    with _exec_stats_lock:
+        _exec_stats["calls"] += 1
+        _exec_stats["cache_hits"] += cache_hit
+        _exec_stats["seconds"] += seconds
+        if res is None:
+            _exec_stats["timeouts"] += 1
+        elif res is False:
+            _exec_stats["errors"] += 1
         else:
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            _exec_stats["ok"] += 1
+
+def run_with_timeout(func: Callable[..., Any], *args, timeout: float = 2.0, **kwargs) -> Any:
+    """Run func with a timeout: None on timeout, False on error.
+
+    In "inprocess" mode the call runs on the current thread and only SQLite work
+    done through connect_db is interrupted when the deadline passes.
+    """
+    t0 = time.monotonic()
+    cacheable = getattr(func, "cache_namespace", None) and len(args) >= 2 and not kwargs
+    if cacheable and _gold_cache is not None:
+        hit, res = _gold_cache.get(func.resolve_db(args[0]), func.cache_namespace, args[1], timeout)
+        if hit:
+            _record_exec(res, time.monotonic() - t0, cache_hit=True)
+            return res
+    cache = _result_cache if cacheable else None
+    if cache is not None:
+        db_path = func.resolve_db(args[0])
+        hit, res = cache.get(db_path, func.cache_namespace, args[1], timeout)
+        if hit:
+            _record_exec(res, time.monotonic() - t0, cache_hit=True)
+            return res
+    if _exec_mode == "inprocess":
+        res, sql_error = _run_in_process(func, args, kwargs, timeout)
+    else:
+        res, sql_error = get_worker_pool().run(func, args, kwargs, timeout, affinity=str(args[0]) if args else None)
+    # Only SQLite's own errors are repeatable; a crashed worker or broken pipe must not be cached
+    if cache is not None and (res is not False or sql_error):
+        cache.put(db_path, func.cache_namespace, args[1], timeout, res)
+    _record_exec(res, time.monotonic() - t0)
+    return res
+
+def save_json(data, output_file, append=False):
+    """Write data as a JSON file; with append=True the record goes to the file's JSONL log instead.
 
-def write_result_to_file(question, pred_sql, score, prover_result, refuter_result, output_dir="output"):
+    Appended logs are compacted back into the JSON array by close_jsonl_writers (also run at exit).
+    """
+    if append:
+        get_jsonl_writer(output_file).append(data)
+    else:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+def load_processed_ids(output_file) -> set:
+    """Question ids already recorded for output_file, read from its JSONL log or else the JSON array"""
+    jsonl_path = jsonl_path_for(output_file)
+    if jsonl_path.exists():
+        items = read_jsonl(jsonl_path)
+    elif os.path.exists(output_file):
+        try:
+            with open(output_file, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except Exception:
+            items = []
+    else:
+        items = []
+    return {str(item.get("question_id")) for item in items if item.get("question_id") is not None}
+
+def write_result_to_file(question, pred_sql, score, prover_result, refuter_result, output_dir="output", extra=None):
     output_file = os.path.join(output_dir, "eval_results.json")
     result = {
         "question_id": question["question_id"], 
@@ -105,46 +395,30 @@ def write_result_to_file(question, pred_sql, score, prover_result, refuter_resul
         "refuter_result": refuter_result
     }
     result.update({k: question[k] for k in ("label", "difficulty") if k in question})
+    if extra:
+        result.update(extra)
     save_json(result, output_file, append=True)
 
+schema_catalog = SchemaCatalog(_get_db_path, connect_db)
+
 def get_db_info(db_id: str, sql: str | list[str]) -> str:
-    all_tables = [row[0] for row in _execute_db_query(db_id, "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name;")]
+    schema = schema_catalog.get(db_id)
     sql_list = [sql] if isinstance(sql, str) else sql
-    involved_tables = list(set(t for single_sql in sql_list for t in all_tables if t.upper() in single_sql.upper()))
-    
-    schema_lines = []
-    for table in involved_tables:
-        table_info = _execute_db_query(db_id, f"PRAGMA table_info('{table}');")
-        fk_info = _execute_db_query(db_id, f"PRAGMA foreign_key_list('{table}');")
-        fk_dict = {fk[3]: f"{fk[2]}.{fk[4]}" for fk in fk_info}
-        
-        col_definitions = []
-        for col in table_info:
-            col_def = f"{col[1]} {col[2]}"
-            if col[5]: col_def += " PRIMARY KEY"
-            if col[1] in fk_dict: col_def += f" foreign key({fk_dict[col[1]]})"
-            col_definitions.append(col_def)
-        schema_lines.append(f"{table} ({', '.join(col_definitions)})\n")
-    
-    descriptions = []
-    desc_file = Path("data/description") / f"{db_id}_schema.json"
-    if desc_file.exists():
-        with open(desc_file, 'r', encoding='utf-8') as f:
-            schema_data = json.load(f)
-        for table in involved_tables:
-            if table in schema_data:
-                table_desc = f"-- Table: {table}\n"
-                for col in schema_data[table]:
-                    col_name, col_desc, val_desc = col.get("column_name"), col.get("column_description"), col.get("value_description")
-                    if col_desc and val_desc:
-                        table_desc += f"  {col_name}: {col_desc}; value_description: {val_desc}\n"
-                    elif col_desc:
-                        table_desc += f"  {col_name}: {col_desc}\n"
-                    elif val_desc:
-                        table_desc += f"  {col_name}: {val_desc}\n"
-                descriptions.append(table_desc)
-    
-    result = f"Database: {db_id}\n"
-    if schema_lines: result += "Schema:\n" + "\n".join(schema_lines) + "\n\n"
-    if descriptions: result += "Descriptions:\n" + "\n".join(descriptions)
-    return result
\ No newline at end of file
+    involved_tables = set()
+    for single_sql in sql_list:
+        tables = [schema.table_index[r] for r in extract_table_refs(single_sql) if r in schema.table_index]
+        if not tables:
+            tables = [schema.table_index[r] for r in extract_identifiers(single_sql) if r in schema.table_index]
+        involved_tables.update(tables)
+    return schema.render(involved_tables)
+
+_row_counts = RowCounts()
+
+def preflight_sql(db_id: str, sql: str) -> Dict[str, Any] | None:
+    """EXPLAIN QUERY PLAN cost estimate for sql (see preflight.estimate_plan); None when it does not compile"""
+    db_path = _get_db_path(db_id)
+    try:
+        tables = schema_catalog.get(db_id).table_index
+        return preflight(connect_db(db_path), str(db_path), sql, tables, _row_counts)
+    except Exception:
+        return None
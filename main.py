@@ -2,22 +2,121 @@ import json
 import os
 import argparse
 import re
+import asyncio
+import time
+from functools import partial
+from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 from typing import List
-from evaluators.utils import execute_sql, write_result_to_file, run_with_timeout, compare_result
+from evaluators.utils import execute_sql, execute_sql_summary, preflight_sql, write_result_to_file, run_with_timeout, compare_result, init_worker_pool, set_exec_mode, format_exec_stats, EXEC_MODES, enable_result_cache, enable_gold_cache, load_processed_ids, close_jsonl_writers, schema_catalog
 from tqdm import tqdm
 from evaluators.Prover import Prover
 from evaluators.Refuter import Refuter
+from evaluators.llm import configure_llm_client, enable_llm_cache, format_llm_cache_stats, format_prompt_cache_stats, record_usage
+from evaluators.accounting import enable_call_log, load_calls, format_call_report, log_call
+from evaluators.batch import BATCH_BACKENDS, BatchState, get_batch_backend, request_line, run_phase, submitted_ids
+from evaluators.render import configure_render
+from evaluators.speculation import speculation_stats, format_speculation_stats
+from evaluators.governor import governor, format_governor_stats
+from evaluators.async_runner import run_queue_async
+from evaluators.scheduler import run_queue, cost_model, prioritize, group_by_affinity, load_latency_history, save_latency_history, format_utilization
+
+SPECULATIVE_PROVER_REASON = "(not available: the Refuter was run concurrently with the Prover)"
+
+
+def _timed_request(request, *args):
+    """Run a Refuter request on this thread, returning (content or None, usage, seconds)"""
+    with record_usage() as usage:
+        start = time.perf_counter()
+        try:
+            content = request(*args)
+        except Exception as e:
+            print(f"Refuter error: {e}")
+            content = None
+        return content, usage, time.perf_counter() - start
+
+
+async def _atimed_request(request, *args):
+    with record_usage() as usage:
+        start = time.perf_counter()
+        try:
+            content = await request(*args)
+        except Exception as e:
+            print(f"Refuter error: {e}")
+            content = None
+        return content, usage, time.perf_counter() - start
+
+
+def _parse_refuter(question, content):
+    if content is None:
+        return None
+    try:
+        return Refuter.parse_response(question, content)
+    except Exception as e:
+        print(f"Refuter error: {e}")
+        return None
+
+
+def _speculate(question, pred_sql, pred_res, gold_res):
+    """Prover and Refuter at once; the Refuter's answer is only parsed and logged if the Prover accepts.
+
+    The Refuter cannot see the Prover's reason in this mode. A rejected speculation cannot
+    be interrupted on a thread, so it finishes in the background and its tokens count as wasted.
+    """
+    speculation_stats.launched()
+    refuter = speculation_executor.submit(_timed_request, Refuter.request, question, pred_sql, pred_res, gold_res, SPECULATIVE_PROVER_REASON)
+    start = time.perf_counter()
+    prover_verdict, _ = Prover.call(question, pred_sql, pred_res)
+    prover_seconds = time.perf_counter() - start
+    if not prover_verdict:
+        if refuter.cancel():
+            speculation_stats.cancelled()
+        else:
+            refuter.add_done_callback(lambda f: speculation_stats.discarded(f.result()[1]))
+        return prover_verdict, None
+    content, usage, refuter_seconds = refuter.result()
+    speculation_stats.used(prover_seconds, refuter_seconds, usage)
+    return prover_verdict, _parse_refuter(question, content)
+
+
+async def _aspeculate(question, pred_sql, pred_res, gold_res):
+    """Async _speculate; a rejected Refuter call still in flight is cancelled"""
+    speculation_stats.launched()
+    refuter = asyncio.create_task(_atimed_request(Refuter.arequest, question, pred_sql, pred_res, gold_res, SPECULATIVE_PROVER_REASON))
+    start = time.perf_counter()
+    prover_verdict, _ = await Prover.acall(question, pred_sql, pred_res)
+    prover_seconds = time.perf_counter() - start
+    if not prover_verdict:
+        if refuter.done():
+            speculation_stats.discarded(refuter.result()[1])
+        else:
+            refuter.cancel()
+            speculation_stats.cancelled()
+        return prover_verdict, None
+    content, usage, refuter_seconds = await refuter
+    speculation_stats.used(prover_seconds, refuter_seconds, usage)
+    return prover_verdict, _parse_refuter(question, content)
+
+
+def _run_pred_sql(db_id, pred_sql):
+    """Execute the prediction; with --preflight a plan estimated as too costly gets --guard-timeout instead of the full budget"""
+    plan = preflight_sql(db_id, pred_sql) if guard_timeout else None
+    timeout = guard_timeout if plan and plan["risky"] else 120
+    start = time.perf_counter()
+    res = run_with_timeout(sql_runner, db_id, pred_sql, timeout=timeout)
+    if plan is not None:
+        plan.update(timeout=timeout, seconds=round(time.perf_counter() - start, 3), timed_out=res is None)
+    return res, plan
 
- 
 
 def _process_question(question):
     pred_sql = question["predicted_sql"]
     db_id = question["db_id"]
     gold_sql = question["gold_sql"]
 
-    pred_res = run_with_timeout(execute_sql, db_id, pred_sql, timeout=120)
-    gold_res = run_with_timeout(execute_sql, db_id, gold_sql, timeout=120)
+    pred_res, pred_plan = _run_pred_sql(db_id, pred_sql)
+    gold_res = run_with_timeout(sql_runner, db_id, gold_sql, timeout=120)
+    extra = {"pred_preflight": pred_plan} if pred_plan else None
 
     score = 0.0
     refuter_verdict = None
@@ -28,7 +127,7 @@ def _process_question(question):
         return qid
     if pred_res is False:
         score = 0.0
-        write_result_to_file(question, pred_sql, score, prover_verdict, refuter_verdict, output_dir)
+        write_result_to_file(question, pred_sql, score, prover_verdict, refuter_verdict, output_dir, extra)
         return None
 
     if compare_result(pred_res, gold_res):
@@ -36,6 +135,11 @@ def _process_question(question):
         if refuter_verdict is None:
             return qid
         score = 1.0 if not refuter_verdict else 0.0
+    elif speculation_executor is not None:
+        prover_verdict, refuter_verdict = _speculate(question, pred_sql, pred_res, gold_res)
+        if prover_verdict is None or (prover_verdict and refuter_verdict is None):
+            return qid
+        score = 1.0 if prover_verdict and not refuter_verdict else 0.0
     elif pred_res is not None:
         prover_verdict, prover_reason = Prover.call(question, pred_sql, pred_res)
         if prover_verdict is None:
@@ -47,15 +151,218 @@ def _process_question(question):
             score = 1.0 if not refuter_verdict else 0.0
 
 
-    write_result_to_file(question, pred_sql, score, prover_verdict, refuter_verdict, output_dir)
+    write_result_to_file(question, pred_sql, score, prover_verdict, refuter_verdict, output_dir, extra)
+    return None
+
+
+async def _aprocess_question(question, sql_executor):
+    pred_sql = question["predicted_sql"]
+    db_id = question["db_id"]
+    gold_sql = question["gold_sql"]
+
+    loop = asyncio.get_running_loop()
+    (pred_res, pred_plan), gold_res = await asyncio.gather(
+        loop.run_in_executor(sql_executor, partial(_run_pred_sql, db_id, pred_sql)),
+        loop.run_in_executor(sql_executor, partial(run_with_timeout, sql_runner, db_id, gold_sql, timeout=120)),
+    )
+    extra = {"pred_preflight": pred_plan} if pred_plan else None
+
+    score = 0.0
+    refuter_verdict = None
+    prover_verdict = None
+    qid = str(question.get("question_id"))
+
+    if pred_res is None or gold_res is None:
+        return qid
+    if pred_res is False:
+        score = 0.0
+        write_result_to_file(question, pred_sql, score, prover_verdict, refuter_verdict, output_dir, extra)
+        return None
+
+    # Hashing large results is CPU work; keep it off the event loop so in-flight LLM requests are not stalled
+    if await loop.run_in_executor(sql_executor, compare_result, pred_res, gold_res):
+        refuter_verdict = await Refuter.acall(question, pred_sql)
+        if refuter_verdict is None:
+            return qid
+        score = 1.0 if not refuter_verdict else 0.0
+    elif speculative:
+        prover_verdict, refuter_verdict = await _aspeculate(question, pred_sql, pred_res, gold_res)
+        if prover_verdict is None or (prover_verdict and refuter_verdict is None):
+            return qid
+        score = 1.0 if prover_verdict and not refuter_verdict else 0.0
+    else:
+        prover_verdict, prover_reason = await Prover.acall(question, pred_sql, pred_res)
+        if prover_verdict is None:
+            return qid
+        if prover_verdict:
+            refuter_verdict = await Refuter.acall(question, pred_sql, pred_res, gold_res, prover_reason)
+            if refuter_verdict is None:
+                return qid
+            score = 1.0 if not refuter_verdict else 0.0
+
+    write_result_to_file(question, pred_sql, score, prover_verdict, refuter_verdict, output_dir, extra)
     return None
 
 
+async def _run_async(questions, concurrency, sql_workers, progress):
+    with ThreadPoolExecutor(max_workers=sql_workers) as sql_executor:
+        results = await run_queue_async(
+            questions,
+            lambda q: _aprocess_question(q, sql_executor),
+            concurrency,
+            on_done=lambda _: progress.update(1),
+            key=lambda q: str(q.get("question_id")),
+        )
+    return [pid for pid in results if pid]
+
+
+def _sql_stage(question):
+    """Execute both queries and classify the question: problem, invalid prediction, equal or different results"""
+    pred_res, pred_plan = _run_pred_sql(question["db_id"], question["predicted_sql"])
+    gold_res = run_with_timeout(sql_runner, question["db_id"], question["gold_sql"], timeout=120)
+    extra = {"pred_preflight": pred_plan} if pred_plan else None
+    if pred_res is None or gold_res is None:
+        outcome = "problem"
+    elif pred_res is False:
+        outcome = "invalid"
+    else:
+        outcome = "equal" if compare_result(pred_res, gold_res) else "differ"
+    return outcome, pred_res, gold_res, extra
+
+
+def _batch_first_request(question):
+    """Phase-1 request of a question: the Prover when results differ, the results-free Refuter when they match"""
+    qid = str(question.get("question_id"))
+    pred_sql = question["predicted_sql"]
+    outcome, pred_res, _, extra = _sql_stage(question)
+    line = None
+    if outcome == "invalid":
+        write_result_to_file(question, pred_sql, 0.0, None, None, output_dir, extra)
+    elif outcome == "equal":
+        line = request_line(f"refuter-{qid}", Refuter.model, Refuter.build_messages(question, pred_sql))
+    elif outcome == "differ":
+        line = request_line(f"prover-{qid}", Prover.model, Prover.build_messages(question, pred_sql, pred_res))
+    return qid, outcome, line, extra
+
+
+def _batch_second_request(item):
+    """Phase-2 Refuter request for a Prover-accepted question; its SQL is executed again to render the results"""
+    question, prover_reason = item
+    qid = str(question.get("question_id"))
+    outcome, pred_res, gold_res, _ = _sql_stage(question)
+    if outcome != "differ":
+        return qid, None
+    messages = Refuter.build_messages(question, question["predicted_sql"], pred_res, gold_res, prover_reason)
+    return qid, request_line(f"refuter-{qid}", Refuter.model, messages)
+
+
+def _parse_prover(question, content):
+    if content is None:
+        return None, None
+    try:
+        return Prover.parse_response(question, content)
+    except Exception as e:
+        print(f"Prover error: {e}")
+        return None, None
+
+
+def _run_batch(questions, backend, state, num_threads, poll_interval, progress):
+    """Two batch phases: Provers (and Refuters of equal results), then Refuters of the accepted predictions.
+
+    batch_state.json lets a rerun pick up from the last finished step; it is removed once both phases are collected.
+    """
+    by_id = {str(q.get("question_id")): q for q in questions}
+    extras, accepted, problems = state.data["extras"], state.data["accepted"], state.data["problems"]
+
+    def build_first():
+        results, _ = run_queue(questions, _batch_first_request, num_threads, on_done=lambda _: progress.update(1))
+        lines = []
+        for qid, outcome, line, extra in results:
+            if extra:
+                extras[qid] = extra
+            if outcome == "problem":
+                problems.append(qid)
+            elif line is not None:
+                lines.append(line)
+        return lines
+
+    def build_second():
+        pending = [(by_id[qid], reason) for qid, reason in accepted.items() if qid in by_id]
+        results, _ = run_queue(pending, _batch_second_request, num_threads)
+        problems.extend(qid for qid, line in results if line is None)
+        return [line for _, line in results if line is not None]
+
+    for phase, build in (("first", build_first), ("second", build_second)):
+        results = run_phase(backend, state, phase, build, output_dir, poll_interval)
+        if state.phase(phase).get("collected"):
+            continue
+        for custom_id, res in results.items():
+            stage, qid = custom_id.split("-", 1)
+            question = by_id.get(qid)
+            if question is None:
+                continue
+            log_call(reasoning_model, f"{stage}_batch", question, 0.0, usage=res["usage"], error=res["error"])
+            pred_sql = question["predicted_sql"]
+            if stage == "prover":
+                prover_verdict, prover_reason = _parse_prover(question, res["content"])
+                if prover_verdict is None:
+                    problems.append(qid)
+                elif prover_verdict:
+                    accepted[qid] = prover_reason
+                else:
+                    write_result_to_file(question, pred_sql, 0.0, prover_verdict, None, output_dir, extras.get(qid))
+                continue
+            refuter_verdict = _parse_refuter(question, res["content"])
+            if refuter_verdict is None:
+                problems.append(qid)
+                continue
+            prover_verdict = True if qid in accepted else None
+            write_result_to_file(question, pred_sql, 0.0 if refuter_verdict else 1.0, prover_verdict, refuter_verdict, output_dir, extras.get(qid))
+        # Expired or cancelled batches and partial error files return no line for some requests
+        missing = [custom_id for custom_id in submitted_ids(state, phase) if custom_id not in results]
+        if missing:
+            print(f"Batch phase '{phase}': {len(missing)} requests returned no result")
+            problems.extend(custom_id.split("-", 1)[1] for custom_id in missing)
+        state.phase(phase)["collected"] = True
+        state.save()
+
+    state.clear()
+    return list(dict.fromkeys(problems))
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--threads", type=int, default=1)
     parser.add_argument("--input", type=str, default="sample.json")
+    parser.add_argument("--exec-mode", choices=EXEC_MODES, default="process")
+    parser.add_argument("--result-cache", type=str, default=None)
+    parser.add_argument("--gold-cache", type=str, default=None, help="Gold SQL artifact from precompute.py; matching gold queries are not executed")
+    parser.add_argument("--cache-hints", action="store_true", help="Mark the system prompt and the shared schema prefix with cache_control for providers that need explicit prompt-caching hints")
+    parser.add_argument("--preview-tokens", type=int, default=None, help="Token budget for each SQL result rendered into a prompt (default: 1500)")
+    parser.add_argument("--speculative", action="store_true", help="When results differ, start the Refuter together with the Prover (without the Prover's reason) and drop it if the Prover rejects")
+    parser.add_argument("--preflight", action="store_true", help="Estimate predicted SQL cost with EXPLAIN QUERY PLAN and record it with the results")
+    parser.add_argument("--guard-timeout", type=float, default=15, help="Timeout in seconds for predicted SQL that --preflight estimates as too costly")
+    parser.add_argument("--stream-results", action="store_true", help="Hash results while fetching and keep only a 20-row preview instead of full DataFrames")
+    parser.add_argument("--batch", choices=BATCH_BACKENDS, default=None, help="Score offline in two batch phases through the provider's Batch API (openai) or a local emulation (local)")
+    parser.add_argument("--batch-poll", type=float, default=60, help="Seconds between batch status polls")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Run the cascade on an asyncio engine; --threads then sizes the SQL executor")
+    parser.add_argument("--concurrency", type=int, default=64, help="Questions in flight with --async")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests-per-minute budget for the reasoning model")
+    parser.add_argument("--tpm", type=float, default=None, help="Tokens-per-minute budget for the reasoning model")
+    parser.add_argument("--db-affinity", action="store_true", help="Schedule questions grouped by db_id, keeping each worker on one database while it has work")
+    parser.add_argument("--schema-cache", type=str, default=None, help="Directory for the on-disk schema catalog")
+    parser.add_argument("--llm-cache", type=str, default=None, help="SQLite file caching LLM responses by model and rendered prompt")
+    parser.add_argument("--llm-cache-ttl", type=float, default=None, help="Seconds before a cached LLM response expires")
     args = parser.parse_args()
+    set_exec_mode(args.exec_mode)
+    sql_runner = execute_sql_summary if args.stream_results else execute_sql
+    guard_timeout = args.guard_timeout if args.preflight else None
+    speculative = args.speculative
+    configure_render(token_budget=args.preview_tokens)
+    if args.result_cache:
+        enable_result_cache(args.result_cache)
+    if args.gold_cache:
+        enable_gold_cache(args.gold_cache)
     reasoning_model = "deepseek/deepseek-r1-0528"
 
     input_stem = os.path.splitext(os.path.basename(args.input))[0]
@@ -63,6 +370,7 @@ if __name__ == "__main__":
     method_root_dir = os.path.join("output", "rose-vec", input_stem)
     output_dir = os.path.join(method_root_dir, reasoning_model_safe, "ROSE")
     os.makedirs(output_dir, exist_ok=True)
+    call_log = enable_call_log(output_dir)
     problems_file_path = os.path.join(method_root_dir, "problem_question_ids.json")
     existing_results_path = os.path.join(output_dir, "eval_results.json")
 
@@ -71,45 +379,64 @@ if __name__ == "__main__":
 
     problem_ids: List[str] = []
     num_threads = max(1, int(args.threads))
+    configure_llm_client(pool_size=args.concurrency if args.use_async else num_threads, cache_hints=args.cache_hints)
+    governor.configure(reasoning_model, rpm=args.rpm, tpm=args.tpm)
+    if args.llm_cache:
+        enable_llm_cache(args.llm_cache, ttl=args.llm_cache_ttl)
 
     with open(args.input, "r", encoding="utf-8") as f:
         questions = json.load(f)
 
-    existing_ids = set()
-    if os.path.exists(existing_results_path):
-        try:
-            with open(existing_results_path, "r", encoding="utf-8") as ef:
-                existing_data = json.load(ef)
-                for item in existing_data:
-                    qid = str(item.get("question_id"))
-                    if qid:
-                        existing_ids.add(qid)
-        except Exception:
-            existing_ids = set()
+    existing_ids = load_processed_ids(existing_results_path)
 
     total_input = len(questions)
     questions = [q for q in questions if str(q.get("question_id")) not in existing_ids]
     to_process = len(questions)
     print(f"Input total: {total_input}, To process: {to_process}")
 
+    if args.schema_cache:
+        schema_catalog.cache_dir = Path(args.schema_cache)
+    schema_catalog.build(q["db_id"] for q in questions)
+
+    if args.exec_mode == "process":
+        init_worker_pool(num_threads)
+    speculation_executor = ThreadPoolExecutor(max_workers=num_threads) if args.speculative and not args.use_async else None
     progress = tqdm(total=to_process, dynamic_ncols=True, mininterval=0.5)
 
-    def worker(idx):
-        local_problems = []
-        slice_questions = questions[idx::num_threads]
-        for q in slice_questions:
-            pid = _process_question(q)
-            if pid:
-                local_problems.append(pid)
-            progress.update(1)
-        return local_problems
-
-    with ThreadPoolExecutor(max_workers=num_threads) as executor:
-        futures = [executor.submit(worker, i) for i in range(num_threads)]
-        for f in futures:
-            problem_ids.extend(f.result())
+    history_path = os.path.join(method_root_dir, "latency_history.json")
+    latency_history = load_latency_history(history_path)
+    cost = cost_model(questions, latency_history)
+
+    report = None
+    if args.batch:
+        state = BatchState(os.path.join(output_dir, "batch_state.json"))
+        backend = get_batch_backend(args.batch, workers=num_threads)
+        problem_ids.extend(_run_batch(questions, backend, state, num_threads, args.batch_poll, progress))
+    elif args.use_async:
+        ordered = group_by_affinity(questions, lambda q: q["db_id"], cost) if args.db_affinity else prioritize(questions, cost)
+        problem_ids.extend(asyncio.run(_run_async(ordered, args.concurrency, num_threads, progress)))
+    else:
+        results, report = run_queue(
+            questions, _process_question, num_threads,
+            cost=cost, key=lambda q: str(q.get("question_id")), on_done=lambda _: progress.update(1),
+            group=(lambda q: q["db_id"]) if args.db_affinity else None,
+        )
+        problem_ids.extend(pid for pid in results if pid)
+        save_latency_history(history_path, latency_history, report["durations"])
 
     progress.close()
+    if speculation_executor is not None:
+        speculation_executor.shutdown(wait=True)
+    close_jsonl_writers()
+    print(format_exec_stats())
+    print(format_governor_stats())
+    print(format_llm_cache_stats())
+    print(format_call_report(load_calls(call_log)))
+    print(format_prompt_cache_stats())
+    if args.speculative:
+        print(format_speculation_stats())
+    if report is not None:
+        print(format_utilization(report))
 
     if len(problem_ids) > 0:
         os.makedirs(method_root_dir, exist_ok=True)
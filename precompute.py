@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from evaluators.utils import connect_db, run_with_timeout, set_exec_mode
+from evaluators.gold_cache import GoldArtifact, build_entry, gold_sql_of
+from evaluators.result_cache import file_digest, normalize_sql
+
+
+def _fetch(db_path, sql):
+    with connect_db(db_path) as conn:
+        cur = conn.execute(sql)
+        return [d[0] for d in cur.description or []], cur.fetchall()
+
+
+def _run_group(db_id, db_path, sqls, timeout, max_rows):
+    """Execute one database's gold SQL on a single worker so its pages and schema stay hot"""
+    set_exec_mode("inprocess")
+    entries = []
+    for sql in sqls:
+        start = time.perf_counter()
+        res = run_with_timeout(_fetch, db_path, sql, timeout=timeout)
+        entries.append(build_entry(db_id, sql, res, time.perf_counter() - start, timeout, max_rows))
+    return db_id, entries
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", type=str, required=True, help="Question file with gold SQL (gold_sql or SQL)")
+    parser.add_argument("--output", type=str, default=None, help="Artifact path (default: output/gold/<input>.gold.pkl)")
+    parser.add_argument("--db-root", type=str, default="dev_databases")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--max-rows", type=int, default=100_000, help="Results above this many rows keep only fingerprint and preview")
+    parser.add_argument("--chunk", type=int, default=64, help="Queries per task; larger databases are split across workers in chunks of this size")
+    args = parser.parse_args()
+
+    input_stem = os.path.splitext(os.path.basename(args.input))[0]
+    output_path = args.output or os.path.join("output", "gold", f"{input_stem}.gold.pkl")
+    artifact = GoldArtifact.load(output_path) if os.path.exists(output_path) else GoldArtifact()
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+
+    groups = defaultdict(dict)
+    digests = {}
+    for q in questions:
+        db_id, sql = q["db_id"], gold_sql_of(q)
+        db_path = Path(args.db_root) / db_id / f"{db_id}.sqlite"
+        if not sql or not db_path.exists():
+            continue
+        if db_id not in digests:
+            digests[db_id] = file_digest(db_path)
+        if GoldArtifact.key(digests[db_id], sql) not in artifact:
+            groups[db_id].setdefault(normalize_sql(sql), sql)
+
+    tasks = [(db_id, str(Path(args.db_root) / db_id / f"{db_id}.sqlite"), chunk)
+             for db_id, sqls in sorted(groups.items(), key=lambda kv: -len(kv[1]))
+             for chunk in _chunks(list(sqls.values()), args.chunk)]
+    total = sum(len(t[2]) for t in tasks)
+    print(f"Input total: {len(questions)}, Gold SQL to execute: {total} across {len(groups)} databases")
+
+    progress = tqdm(total=total, dynamic_ncols=True, mininterval=0.5)
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [pool.submit(_run_group, db_id, db_path, sqls, args.timeout, args.max_rows) for db_id, db_path, sqls in tasks]
+        for future in as_completed(futures):
+            db_id, entries = future.result()
+            for entry in entries:
+                artifact.add(digests[db_id], entry)
+            progress.update(len(entries))
+    progress.close()
+
+    artifact.save(output_path)
+    outcomes = defaultdict(int)
+    for entry in artifact.entries.values():
+        outcomes[entry["outcome"]] += 1
+    seconds = sum(e["seconds"] for e in artifact.entries.values())
+    print(f"Gold artifact: {output_path}, entries={len(artifact)}, ok={outcomes['ok']}, errors={outcomes['error']}, "
+          f"timeouts={outcomes['timeout']}, execution={seconds:.1f}s")
@@ -69,6 +69,9 @@ Follow this process:
 
 Return ONLY the JSON object directly.
 
+###### Database Information
+{db_info}
+
 ###### Question
 {question}
 
@@ -81,9 +84,6 @@ Return ONLY the JSON object directly.
 ###### Gold Standard SQL
 {gold_sql}
 
-###### Database Information
-{db_info}
-
 ###### Predicted SQL Execution Result
 {sql_result}
 
@@ -64,6 +64,9 @@ Follow this process:
 
 Return ONLY the JSON object directly.
 
+###### Database Information
+{db_info}
+
 ###### Question
 {question}
 
@@ -73,9 +76,6 @@ Return ONLY the JSON object directly.
 ###### Predicted SQL
 {predicted_sql}
 
-###### Database Information
-{db_info}
-
 ###### SQL Execution Result
 {sql_result}
 """
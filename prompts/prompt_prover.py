@@ -119,6 +119,9 @@ Analyze the predicted SQL query to determine if it adequately answers the given
 
 Return ONLY the JSON object directly.
 
+###### Database Information
+{db_info}
+
 ###### Question
 {question}
 
@@ -128,9 +131,6 @@ Return ONLY the JSON object directly.
 ###### Predicted SQL
 {predicted_sql}
 
-###### Database Information
-{db_info}
-
 ###### SQL Execution Result
 {sql_result}
 """
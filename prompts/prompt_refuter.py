@@ -190,15 +190,15 @@ Follow this process:
 
 Return ONLY the JSON object directly.
 
+###### Database Information
+{db_info}
+
 ###### Question
 {question}
 
 ###### Evidence
 {evidence}
 
-###### Database Information
-{db_info}
-
 ###### Predicted SQL
 {predicted_sql}
 
@@ -255,15 +255,15 @@ Execution results are not provided because the gold and predicted SQL produce id
 
 Return ONLY the JSON object directly.
 
+###### Database Information
+{db_info}
+
 ###### Question
 {question}
 
 ###### Evidence
 {evidence}
 
-###### Database Information
-{db_info}
-
 ###### Predicted SQL
 {predicted_sql}
 
@@ -68,15 +68,15 @@ Follow this process:
 
 Return ONLY the JSON object directly.
 
+###### Database Information
+{db_info}
+
 ###### Question
 {question}
 
 ###### Evidence
 {evidence}
 
-###### Database Information
-{db_info}
-
 ###### Predicted SQL
 {predicted_sql}
 
@@ -0,0 +1,11 @@
+from evaluators.sql_tables import extract_table_refs
+
+
+def test_alias_after_keyword_named_table():
+    refs = extract_table_refs("SELECT m.id FROM Match m JOIN Team t ON m.home_team_api_id = t.team_api_id")
+    assert refs == {"match", "team"}
+
+
+def test_comma_join_after_on_clause():
+    refs = extract_table_refs("SELECT * FROM a JOIN b ON a.x = b.x, c WHERE c.y = 1")
+    assert refs == {"a", "b", "c"}